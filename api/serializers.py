@@ -113,15 +113,19 @@ class MonsterSerializer(serializers.HyperlinkedModelSerializer):
             'base_hp', 'base_attack', 'base_defense', 'speed', 'crit_rate', 'crit_damage', 'resistance', 'accuracy',
             'max_lvl_hp', 'max_lvl_attack', 'max_lvl_defense',
             'awakens_from', 'awakens_to',
-            'awaken_mats_fire_low', 'awaken_mats_fire_mid', 'awaken_mats_fire_high',
-            'awaken_mats_water_low', 'awaken_mats_water_mid', 'awaken_mats_water_high',
-            'awaken_mats_wind_low', 'awaken_mats_wind_mid', 'awaken_mats_wind_high',
-            'awaken_mats_light_low', 'awaken_mats_light_mid', 'awaken_mats_light_high',
-            'awaken_mats_dark_low', 'awaken_mats_dark_mid', 'awaken_mats_dark_high',
-            'awaken_mats_magic_low', 'awaken_mats_magic_mid', 'awaken_mats_magic_high',
             'source', 'fusion_food', 'homunculus'
         )
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+
+        # Awakening costs are stored as AwakenCost rows, but this API has always had a field for each essence
+        for element, sizes in instance.awakening_materials.items():
+            for size, quantity in sizes.items():
+                data[f'awaken_mats_{element}_{size}'] = quantity
+
+        return data
+
     def get_element(self, instance):
         return instance.get_element_display()
 
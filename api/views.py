@@ -1,4 +1,5 @@
-from django.http import JsonResponse
+from django.db.models import Prefetch
+from django.http import HttpResponse
 from django.views.decorators.cache import cache_page
 from django_filters import rest_framework as filters
 from rest_framework import viewsets, renderers
@@ -6,7 +7,7 @@ from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework_extensions.cache.mixins import CacheResponseMixin
 
-from bestiary.models import Monster, Skill, LeaderSkill, SkillEffect, Source
+from bestiary.models import AwakenCost, Monster, Skill, LeaderSkill, SkillEffect, Source
 from .serializers import MonsterSerializer, MonsterSummarySerializer, MonsterSkillSerializer, \
     MonsterLeaderSkillSerializer, MonsterSkillEffectSerializer, MonsterSourceSerializer
 
@@ -24,7 +25,9 @@ class BestiarySetPagination(PageNumberPagination):
 
 # Django REST framework views
 class MonsterViewSet(CacheResponseMixin, viewsets.ReadOnlyModelViewSet):
-    queryset = Monster.objects.all()
+    queryset = Monster.objects.all().prefetch_related(
+        Prefetch('awakencost_set', queryset=AwakenCost.objects.select_related('item')),
+    )
     renderer_classes = (renderers.BrowsableAPIRenderer, renderers.JSONRenderer)
     filter_backends = (filters.DjangoFilterBackend,)
     filter_fields = ('name', 'element', 'archetype', 'base_stars', 'natural_stars', 'obtainable', 'is_awakened', 'com2us_id', 'family_id', 'homunculus')
@@ -73,78 +76,5 @@ class MonsterSourceViewSet(viewsets.ReadOnlyModelViewSet):
 
 @cache_page(60 * 15)
 def bestary_stat_charts(request, pk):
-    chart_template = {
-        'chart': {
-            'type': 'line'
-        },
-        'title': {
-            'text': 'Stat Growth By Level'
-        },
-        'xAxis': {
-            'tickInterval': 5,
-            'showFirstLabel': True
-        },
-        'yAxis': [
-            {
-                'title': {
-                    'text': 'HP'
-                },
-                'id': 'hp',
-                'min': 0,
-                'opposite': True,
-                'endOnTick': False,
-            },
-            {
-                'title': {
-                    'text': 'ATK DEF'
-                },
-                'id': 'atkdef',
-                'min': 0,
-                'endOnTick': False,
-            }
-        ],
-        'series': None
-    }
-
-    monster = Monster.objects.get(pk=pk)
-
-    data_series = []
-
-    for grade in range(monster.natural_stars, 7):
-        data_series.append({
-            'name': 'HP ' + str(grade) + '*',
-            'data': [monster.actual_hp(grade, level) for level in range(1, monster.max_level_from_stars(grade) + 1)],
-            'pointStart': 1,
-            'visible': True if grade == 6 else False,
-            'yAxis': 'hp',
-        })
-        data_series.append({
-            'name': 'ATK ' + str(grade) + '*',
-            'data': [monster.actual_attack(grade, level) for level in range(1, monster.max_level_from_stars(grade) + 1)],
-            'pointStart': 1,
-            'visible': True if grade == 6 else False,
-            'yAxis': 'atkdef',
-        })
-        data_series.append({
-            'name': 'DEF ' + str(grade) + '*',
-            'data': [monster.actual_defense(grade, level) for level in range(1, monster.max_level_from_stars(grade) + 1)],
-            'pointStart': 1,
-            'visible': True if grade == 6 else False,
-            'yAxis': 'atkdef',
-        })
-
-    if data_series:
-        # Determine max values for Y axis
-        max_stat_value = round(max(
-            monster.max_lvl_hp / 15,
-            monster.max_lvl_attack,
-            monster.max_lvl_defense,
-        ))
-
-        chart_template['series'] = data_series
-        chart_template['yAxis'][0]['max'] = max_stat_value * 15
-        chart_template['yAxis'][1]['max'] = max_stat_value
-
-        return JsonResponse(chart_template, safe=False)
-    else:
-        return JsonResponse({})
+    monster = Monster.objects.select_related('stat_table').get(pk=pk)
+    return HttpResponse(monster.stat_chart_json(), content_type='application/json')
@@ -114,6 +114,12 @@ class MonsterAdmin(admin.ModelAdmin):
     )
     search_fields = ('name', 'com2us_id', 'skill_group_id', 'family_id')
     save_as = True
+    actions = ['update_derived_fields']
+
+    def update_derived_fields(self, request, queryset):
+        updated = queryset.update_derived_fields()
+        self.message_user(request, f'Updated {len(updated)} of {queryset.count()} selected monsters.')
+    update_derived_fields.short_description = 'Recalculate stats and slugs'
 
 
 class SkillUpgradeInline(admin.TabularInline):
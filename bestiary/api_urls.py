@@ -13,3 +13,4 @@ router.register(r'items', viewsets.GameItemViewSet, basename='bestiary/items')
 router.register(r'fusions', viewsets.FusionViewSet, basename='bestiary/fusions')
 router.register(r'dungeons', viewsets.DungeonViewSet, basename='bestiary/dungeons')
 router.register(r'levels', viewsets.LevelViewSet, basename='bestiary/levels')
+router.register(r'material-planner', viewsets.MaterialPlannerViewSet, basename='bestiary/material-planner')
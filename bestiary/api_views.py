@@ -1,9 +1,12 @@
 from django_filters import rest_framework as filters
 from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import OrderingFilter
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
 from rest_framework_extensions.cache.mixins import CacheResponseMixin
 
-from bestiary import api_filters, models, pagination, serializers
+from bestiary import api_filters, models, pagination, planner, serializers
 
 
 # Django REST framework views
@@ -114,7 +117,7 @@ class GameItemViewSet(CacheResponseMixin, viewsets.ReadOnlyModelViewSet):
 
 
 class FusionViewSet(CacheResponseMixin, viewsets.ReadOnlyModelViewSet):
-    queryset = models.Fusion.objects.all().prefetch_related(
+    queryset = models.Fusion.objects.all().with_awakening_cost().prefetch_related(
         'ingredients',
     ).order_by('pk')
     serializer_class = serializers.FusionSerializer
@@ -134,3 +137,38 @@ class LevelViewSet(CacheResponseMixin, viewsets.ReadOnlyModelViewSet):
     )
     serializer_class = serializers.LevelSerializer
     pagination_class = pagination.BestiarySetPagination
+
+
+class MaterialPlannerViewSet(viewsets.ViewSet):
+    """Total materials needed to obtain a list of monsters.
+
+    Takes comma separated ids of the target `monsters`, optionally the `owned` monsters that can be
+    used as fusion ingredients or instead of awakening and the `homunculus_skills` to purchase.
+    Ids may be repeated for multiple copies.
+    """
+    # Read only, and not tied to a model for DjangoModelPermissions
+    permission_classes = (AllowAny, )
+
+    def list(self, request):
+        monster_ids = self._id_list(request, 'monsters')
+        if not monster_ids:
+            raise ValidationError({'monsters': 'At least one monster id is required.'})
+
+        try:
+            requirements = planner.material_requirements(
+                monster_ids,
+                owned_monster_ids=self._id_list(request, 'owned'),
+                homunculus_skill_ids=self._id_list(request, 'homunculus_skills'),
+            )
+        except ValueError as e:
+            raise ValidationError({'monsters': str(e)})
+
+        return Response(requirements)
+
+    @staticmethod
+    def _id_list(request, param):
+        value = request.query_params.get(param, '')
+        try:
+            return [int(pk) for pk in value.split(',') if pk.strip()]
+        except ValueError:
+            raise ValidationError({param: 'Expected a comma separated list of ids.'})
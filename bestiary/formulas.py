@@ -0,0 +1,116 @@
+import ast
+import json
+import keyword
+from functools import lru_cache, reduce
+
+import numpy as np
+
+# Skill multiplier formulas are stored as a JSON expression tree. Numbers and com2us stat names
+# (ATK, DEF, ATTACK_SPEED, TARGET_CUR_HP, ...) are leaves, operations are lists of [operator, *operands].
+BINARY_OPERATORS = {
+    ast.Add: '+',
+    ast.Sub: '-',
+    ast.Mult: '*',
+    ast.Div: '/',
+    ast.Pow: '**',
+}
+
+FUNCTIONS = {
+    'Min': 'min',
+    'Max': 'max',
+    'floor': 'floor',
+    'ceiling': 'ceil',
+    'Abs': 'abs',
+}
+
+NUMPY_FUNCTIONS = {
+    'min': np.minimum,
+    'max': np.maximum,
+    'floor': np.floor,
+    'ceil': np.ceil,
+    'abs': np.abs,
+}
+
+
+def parse(formula):
+    """Convert a simplified multiplier formula such as `1.8*ATK + 2.5*DEF` into an expression tree."""
+    try:
+        tree = ast.parse(formula, mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f'Unable to parse multiplier formula `{formula}`') from e
+
+    return _to_expr(tree.body)
+
+
+def _to_expr(node):
+    if isinstance(node, ast.Num):
+        return node.n
+    elif isinstance(node, ast.Name):
+        return node.id
+    elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        return ['neg', _to_expr(node.operand)]
+    elif isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+        return [BINARY_OPERATORS[type(node.op)], _to_expr(node.left), _to_expr(node.right)]
+    elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS:
+        return [FUNCTIONS[node.func.id]] + [_to_expr(arg) for arg in node.args]
+
+    raise ValueError(f'Unsupported multiplier formula element: {ast.dump(node)}')
+
+
+def variables(expr):
+    """Stat names used in an expression tree, in order of first appearance."""
+    if isinstance(expr, str):
+        return [expr]
+    elif isinstance(expr, list):
+        found = []
+        for operand in expr[1:]:
+            found += [var for var in variables(operand) if var not in found]
+        return found
+
+    return []
+
+
+def compile_expr(expr):
+    """Compile an expression tree into a function taking each stat as a keyword argument.
+
+    Operands may be numbers or NumPy arrays, so a single call can evaluate the formula for many
+    monsters or stat combinations at once. The stat names are available as `func.variables`.
+    """
+    return _compile(json.dumps(expr))
+
+
+@lru_cache(maxsize=None)
+def _compile(expr_json):
+    expr = json.loads(expr_json)
+    args = variables(expr)
+
+    for arg in args:
+        if not arg.isidentifier() or keyword.iskeyword(arg):
+            raise ValueError(f'Invalid stat name in multiplier formula: {arg}')
+
+    source = f'lambda {", ".join(args)}: {_to_source(expr)}'
+    func = eval(compile(source, '<multiplier formula>', 'eval'), {'__builtins__': {}, '_f': NUMPY_FUNCTIONS})
+    func.variables = tuple(args)
+    return func
+
+
+def _to_source(expr):
+    if isinstance(expr, bool):
+        raise ValueError(f'Invalid multiplier formula operand: {expr}')
+    elif isinstance(expr, (int, float)):
+        return repr(expr)
+    elif isinstance(expr, str):
+        return expr
+
+    operator, operands = expr[0], [_to_source(operand) for operand in expr[1:]]
+
+    if operator == 'neg':
+        return f'(-{operands[0]})'
+    elif operator in BINARY_OPERATORS.values():
+        return f'({operands[0]} {operator} {operands[1]})'
+    elif operator in ('min', 'max'):
+        return reduce(lambda left, right: f'_f[{operator!r}]({left}, {right})', operands)
+    elif operator in NUMPY_FUNCTIONS:
+        return f'_f[{operator!r}]({operands[0]})'
+
+    raise ValueError(f'Unknown multiplier formula operator: {operator}')
@@ -1,47 +1,51 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 from bestiary import parse
+from bestiary.parse.pipeline import STAGES, completed_stages, select_stages, run_stages
 
 
 class Command(BaseCommand):
     help = 'Parse all bestiary data from game files'
 
-    def handle(self, *args, **kwargs):
-        self.stdout.write('Processing static files...')
-        parse.static.decrypt_images()
-        parse.static.crop_images()
-
-        self.stdout.write('Parsing skill data...')
-        parse.skills()
-
-        self.stdout.write('Parsing homunculus skill data...')
-        parse.homonculus_skills()
-
-        self.stdout.write('Parsing monster data...')
-        parse.monsters()
-
-        self.stdout.write('Setting monster awaken/transformation relationships...')
-        parse.monster_relationships()
-
-        self.stdout.write('Parsing monster crafting data...')
-        parse.monster_crafting()
+    def add_arguments(self, parser):
+        parser.add_argument('--only', nargs='+', metavar='STAGE', help=f'Only run these stages. Choices are: {", ".join(STAGES)}')
+        parser.add_argument('--skip', nargs='+', metavar='STAGE', help='Do not run these stages')
+        parser.add_argument('--workers', type=int, default=4, help='Maximum number of database stages to run at once')
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help=(
+                'Skip stages that already completed for the current game data version and parser code. '
+                'Only meant for re-running the same command after an interrupted or failed run; stages '
+                'are not re-run when their other input files or the database changed in between.'
+            ),
+        )
 
-        self.stdout.write('Parsing scenario data...')
-        parse.scenarios()
-
-        self.stdout.write('Parsing rift raid data...')
-        parse.rift_raids()
-
-        self.stdout.write('Parsing elemental rift beast data...')
-        parse.elemental_rifts()
-
-        self.stdout.write('Parsing secret dungeon data...')
-        parse.secret_dungeons()
-
-        self.stdout.write('Parsing dimensional hole data...')
-        parse.dimensional_hole()
-
-        self.stdout.write('Parsing craft materials...')
-        parse.craft_materials()
+    def handle(self, *args, **kwargs):
+        try:
+            stages = select_stages(kwargs['only'], kwargs['skip'])
+        except ValueError as e:
+            raise CommandError(e)
+
+        version = parse.game_data.tables.version
+        self.stdout.write(f'Game data version {version}')
+
+        if kwargs['resume']:
+            completed = completed_stages(version)
+            for stage in stages:
+                if stage.name in completed:
+                    self.stdout.write(f'Skipping {stage.name}, already completed')
+            stages = [stage for stage in stages if stage.name not in completed]
+
+        if any(stage.uses_context for stage in stages):
+            context = parse.ParseContext.load()
+        else:
+            context = None
+
+        timings = run_stages(stages, context, max_workers=kwargs['workers'], log=self.stdout.write, version=version)
+
+        self.stdout.write('Stage timings:')
+        for name, elapsed in timings.items():
+            self.stdout.write(f'  {name:<24}{elapsed:8.2f}s')
 
         self.stdout.write(self.style.SUCCESS('Done!'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from bestiary.models import Monster
+from bestiary.parse.monsters import monster_stat_tables
+
+
+class Command(BaseCommand):
+    help = 'Recalculate derived monster fields such as stats and slugs, and stat tables, for all monsters'
+
+    def handle(self, *args, **kwargs):
+        updated = Monster.objects.all().update_derived_fields()
+
+        if kwargs['verbosity'] > 1:
+            for monster in updated:
+                self.stdout.write(f'Updated {monster} ({monster.com2us_id})')
+
+        self.stdout.write(self.style.SUCCESS(f'Updated {len(updated)} of {Monster.objects.count()} monsters'))
+
+        stat_tables = monster_stat_tables(verbose=False)
+        self.stdout.write(self.style.SUCCESS(f'Updated stat tables of {len(stat_tables)} monsters'))
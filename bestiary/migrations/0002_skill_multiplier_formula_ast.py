@@ -0,0 +1,18 @@
+# Generated by Django 2.2.24 on 2026-10-18 18:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bestiary', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='skill',
+            name='multiplier_formula_ast',
+            field=models.TextField(blank=True, help_text='Parsed multiplier formula as a JSON expression tree', null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.24 on 2026-10-18 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bestiary', '0002_skill_multiplier_formula_ast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParseCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(help_text='Version string of the parsed localvalue.dat', max_length=30)),
+                ('stage', models.CharField(max_length=50)),
+                ('completed', models.DateTimeField(auto_now=True)),
+                ('duration', models.FloatField(help_text='Run time in seconds')),
+            ],
+            options={
+                'ordering': ('-completed',),
+                'unique_together': {('version', 'stage')},
+            },
+        ),
+    ]
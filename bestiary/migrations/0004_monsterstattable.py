@@ -0,0 +1,23 @@
+# Generated by Django 2.2.24 on 2026-10-18 19:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bestiary', '0003_parsecheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonsterStatTable',
+            fields=[
+                ('monster', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stat_table', serialize=False, to='bestiary.Monster')),
+                ('stats_key', models.CharField(help_text='Monster values the table was calculated from', max_length=100)),
+                ('curves', models.TextField(help_text='JSON array of HP, ATK and DEF indexed by stat, grade and level')),
+                ('chart', models.TextField(help_text='Highcharts JSON of stat growth by level')),
+            ],
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 2.2.24 on 2026-10-18 19:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def set_chains(apps, schema_editor):
+    # Same as Monster.update_derived_fields(), which the historical model doesn't have
+    Monster = apps.get_model('bestiary', 'Monster')
+    monsters = {monster.pk: monster for monster in Monster.objects.using(schema_editor.connection.alias)}
+
+    for monster in monsters.values():
+        base = monster
+        position = 0
+        while base.awakens_from_id in monsters and monsters[base.awakens_from_id].obtainable and position < len(monsters):
+            base = monsters[base.awakens_from_id]
+            position += 1
+
+        if base is not monster:
+            monster.chain_base_id = base.pk
+            monster.chain_position = position
+
+    Monster.objects.using(schema_editor.connection.alias).bulk_update(
+        [monster for monster in monsters.values() if monster.chain_base_id],
+        ['chain_base', 'chain_position'],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bestiary', '0004_monsterstattable'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monster',
+            name='chain_base',
+            field=models.ForeignKey(blank=True, editable=False, help_text='First monster of the awakening chain, if it is not this monster', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='bestiary.Monster'),
+        ),
+        migrations.AddField(
+            model_name='monster',
+            name='chain_position',
+            field=models.IntegerField(default=0, editable=False, help_text='Awakening steps from the first monster of the chain'),
+        ),
+        migrations.AlterField(
+            model_name='monster',
+            name='family_id',
+            field=models.IntegerField(blank=True, db_index=True, help_text='Identifier that matches same family monsters', null=True),
+        ),
+        migrations.RunPython(set_chains, migrations.RunPython.noop),
+    ]
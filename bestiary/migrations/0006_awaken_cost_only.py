@@ -0,0 +1,160 @@
+# Generated by Django 2.2.24 on 2026-10-18 19:34
+
+from django.db import migrations
+
+# Copied from the models at the time of this migration: GameItem.CATEGORY_ESSENCE and the com2us id
+# of the essence item stored in each removed Monster column
+ESSENCE_CATEGORY = 11
+ESSENCE_FIELDS = {
+    'awaken_mats_magic_low': 11006,
+    'awaken_mats_magic_mid': 12006,
+    'awaken_mats_magic_high': 13006,
+    'awaken_mats_water_low': 11001,
+    'awaken_mats_water_mid': 12001,
+    'awaken_mats_water_high': 13001,
+    'awaken_mats_fire_low': 11002,
+    'awaken_mats_fire_mid': 12002,
+    'awaken_mats_fire_high': 13002,
+    'awaken_mats_wind_low': 11003,
+    'awaken_mats_wind_mid': 12003,
+    'awaken_mats_wind_high': 13003,
+    'awaken_mats_light_low': 11004,
+    'awaken_mats_light_mid': 12004,
+    'awaken_mats_light_high': 13004,
+    'awaken_mats_dark_low': 11005,
+    'awaken_mats_dark_mid': 12005,
+    'awaken_mats_dark_high': 13005,
+}
+
+
+def _essence_fields(apps):
+    # Monster column for each essence item, for the essence items that exist
+    GameItem = apps.get_model('bestiary', 'GameItem')
+    items = dict(GameItem.objects.filter(category=ESSENCE_CATEGORY).values_list('com2us_id', 'pk'))
+    return {items[com2us_id]: field for field, com2us_id in ESSENCE_FIELDS.items() if com2us_id in items}
+
+
+def columns_to_awaken_costs(apps, schema_editor):
+    # Parsing has written AwakenCost rows alongside the columns, this only fills in any that are missing
+    Monster = apps.get_model('bestiary', 'Monster')
+    AwakenCost = apps.get_model('bestiary', 'AwakenCost')
+    fields = _essence_fields(apps)
+
+    # The columns are removed after this, so stop rather than lose quantities that have nowhere to go
+    missing = [field for field in ESSENCE_FIELDS if field not in fields.values()]
+    lost = [
+        f'{monster["com2us_id"]} {field}'
+        for monster in (Monster.objects.values('com2us_id', *missing) if missing else [])
+        for field in missing
+        if monster[field]
+    ]
+    if lost:
+        raise RuntimeError(
+            'No essence GameItem to copy awakening materials of these monsters to, parse the game items '
+            'and migrate again: ' + ', '.join(lost)
+        )
+
+    existing = set(AwakenCost.objects.values_list('monster', 'item'))
+
+    AwakenCost.objects.bulk_create([
+        AwakenCost(monster_id=monster['pk'], item_id=item, quantity=monster[field])
+        for monster in Monster.objects.values('pk', *fields.values())
+        for item, field in fields.items()
+        if monster[field] and (monster['pk'], item) not in existing
+    ], batch_size=500)
+
+
+def awaken_costs_to_columns(apps, schema_editor):
+    Monster = apps.get_model('bestiary', 'Monster')
+    AwakenCost = apps.get_model('bestiary', 'AwakenCost')
+    fields = _essence_fields(apps)
+
+    monsters = {}
+    for monster, item, quantity in AwakenCost.objects.filter(item__in=list(fields)).values_list('monster', 'item', 'quantity'):
+        monsters.setdefault(monster, Monster(pk=monster))
+        setattr(monsters[monster], fields[item], quantity)
+
+    Monster.objects.bulk_update(list(monsters.values()), list(fields.values()), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bestiary', '0005_monster_chain'),
+    ]
+
+    operations = [
+        migrations.RunPython(columns_to_awaken_costs, awaken_costs_to_columns),
+        migrations.RemoveField(
+            model_name='monster',
+            name='awaken_mats_dark_high',
+        ),
+        migrations.RemoveField(
+            model_name='monster',
+            name='awaken_mats_dark_low',
+        ),
+        migrations.RemoveField(
+            model_name='monster',
+            name='awaken_mats_dark_mid',
+        ),
+        migrations.RemoveField(
+            model_name='monster',
+            name='awaken_mats_fire_high',
+        ),
+        migrations.RemoveField(
+            model_name='monster',
+            name='awaken_mats_fire_low',
+        ),
+        migrations.RemoveField(
+            model_name='monster',
+            name='awaken_mats_fire_mid',
+        ),
+        migrations.RemoveField(
+            model_name='monster',
+            name='awaken_mats_light_high',
+        ),
+        migrations.RemoveField(
+            model_name='monster',
+            name='awaken_mats_light_low',
+        ),
+        migrations.RemoveField(
+            model_name='monster',
+            name='awaken_mats_light_mid',
+        ),
+        migrations.RemoveField(
+            model_name='monster',
+            name='awaken_mats_magic_high',
+        ),
+        migrations.RemoveField(
+            model_name='monster',
+            name='awaken_mats_magic_low',
+        ),
+        migrations.RemoveField(
+            model_name='monster',
+            name='awaken_mats_magic_mid',
+        ),
+        migrations.RemoveField(
+            model_name='monster',
+            name='awaken_mats_water_high',
+        ),
+        migrations.RemoveField(
+            model_name='monster',
+            name='awaken_mats_water_low',
+        ),
+        migrations.RemoveField(
+            model_name='monster',
+            name='awaken_mats_water_mid',
+        ),
+        migrations.RemoveField(
+            model_name='monster',
+            name='awaken_mats_wind_high',
+        ),
+        migrations.RemoveField(
+            model_name='monster',
+            name='awaken_mats_wind_low',
+        ),
+        migrations.RemoveField(
+            model_name='monster',
+            name='awaken_mats_wind_mid',
+        ),
+    ]
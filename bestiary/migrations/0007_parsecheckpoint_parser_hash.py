@@ -0,0 +1,18 @@
+# Generated by Django 2.2.24 on 2026-10-18 19:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bestiary', '0006_awaken_cost_only'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parsecheckpoint',
+            name='parser_hash',
+            field=models.CharField(blank=True, help_text='Hash of the parser code that ran the stage', max_length=64),
+        ),
+    ]
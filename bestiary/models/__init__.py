@@ -1,5 +1,6 @@
 from .base import Elements, Quality, Stats
+from .checkpoints import ParseCheckpoint
 from .dungeons import Dungeon, Level, SecretDungeon, Wave, Enemy
 from .items import GameItem, ItemQuantity, Source, ESSENCE_MAP
-from .monsters import Monster, AwakenCost, MonsterCraftCost, Fusion
+from .monsters import Monster, AwakenCost, MonsterCraftCost, MonsterStatTable, Fusion
 from .skills import Skill, SkillUpgrade, LeaderSkill, SkillEffect, SkillEffectDetail, ScalingStat, HomunculusSkill, HomunculusSkillCraftCost
@@ -0,0 +1,17 @@
+from django.db import models
+
+
+class ParseCheckpoint(models.Model):
+    # Records a game data import stage that completed for a version of the game data
+    version = models.CharField(max_length=30, help_text='Version string of the parsed localvalue.dat')
+    parser_hash = models.CharField(max_length=64, blank=True, help_text='Hash of the parser code that ran the stage')
+    stage = models.CharField(max_length=50)
+    completed = models.DateTimeField(auto_now=True)
+    duration = models.FloatField(help_text='Run time in seconds')
+
+    class Meta:
+        unique_together = ('version', 'stage')
+        ordering = ('-completed', )
+
+    def __str__(self):
+        return f'{self.stage} ({self.version})'
@@ -49,9 +49,12 @@ class Dungeon(models.Model):
         return self.name
 
     def save(self, *args, **kwargs):
-        self.slug = slugify(self.name)
+        self.update_derived_fields()
         super(Dungeon, self).save(*args, **kwargs)
 
+    def update_derived_fields(self):
+        self.slug = slugify(self.name)
+
 
 class SecretDungeon(Dungeon):
     monster = models.ForeignKey(Monster, on_delete=models.CASCADE)
@@ -3,6 +3,8 @@ from django.db import models
 from django.utils.safestring import mark_safe
 from django.utils.text import slugify
 
+from bestiary import sprites
+
 
 ESSENCE_MAP = {
     'magic': {
@@ -97,13 +99,15 @@ class GameItem(models.Model):
         return self.name
 
     def save(self, *args, **kwargs):
-        self.slug = slugify(self.name)
+        self.update_derived_fields()
         super().save(*args, **kwargs)
 
+    def update_derived_fields(self):
+        self.slug = slugify(self.name)
+
     def image_tag(self):
         if self.icon:
-            path = static('herders/images/items/' + self.icon)
-            return mark_safe(f'<img src="{path}" height="42" width="42" loading="lazy" />')
+            return sprites.image_tag('items', self.icon, alt=self.name, size=42)
         else:
             return 'No Image'
 
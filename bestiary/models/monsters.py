@@ -1,15 +1,91 @@
+import json
 from collections import OrderedDict
 from enum import IntEnum
-from math import log, exp
 
-from django.contrib.staticfiles.templatetags.staticfiles import static
+import numpy as np
 from django.db import models
-from django.db.models import Q
-from django.utils.safestring import mark_safe
+from django.db.models import Exists, OuterRef, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils.functional import cached_property
 from django.utils.text import slugify
 
+from bestiary import sprites, stat_curves
 from . import base
-from .items import GameItem, ItemQuantity
+from .items import ESSENCE_MAP, GameItem, ItemQuantity
+
+# Elements and sizes of awakening essences, in display order
+AWAKENING_ESSENCES = [
+    (element, size)
+    for element in ('magic', 'fire', 'water', 'wind', 'light', 'dark')
+    for size in ('low', 'mid', 'high')
+]
+
+
+def _essence_quantities(totals):
+    # {element: {size: quantity}} in display order, from quantities keyed by essence com2us_id
+    mats = OrderedDict()
+    for element, size in AWAKENING_ESSENCES:
+        mats.setdefault(element, OrderedDict())[size] = totals.get(ESSENCE_MAP[element][size], 0)
+
+    return mats
+
+
+class MonsterQuerySet(models.QuerySet):
+    def awakening_materials(self):
+        """Essences needed to awaken each of these monsters once, in total, with one aggregate query.
+
+        Returns the same shape as Monster.awakening_materials.
+        """
+        totals = AwakenCost.objects.filter(
+            monster__in=self,
+            item__category=GameItem.CATEGORY_ESSENCE,
+        ).values_list('item__com2us_id').annotate(Sum('quantity'))
+        return _essence_quantities(dict(totals))
+
+    def update_derived_fields(self):
+        """Recalculate the derived fields of these monsters in memory and save the changed ones in bulk.
+
+        Slugs and awakening chains depend on related monsters, so all monsters are loaded with one query
+        and linked to each other. Returns the list of monsters that were updated.
+        """
+        selected = set(self.values_list('pk', flat=True))
+        monsters = {monster.pk: monster for monster in self.model._default_manager.using(self.db)}
+        for monster in monsters.values():
+            for field in ('awakens_from', 'awakens_to'):
+                related_id = getattr(monster, f'{field}_id')
+                if related_id in monsters:
+                    setattr(monster, field, monsters[related_id])
+
+        stat_curves.monster_stat_curves(monsters.values())
+
+        updated = []
+        update_fields = set()
+        done = set()
+
+        def update(monster):
+            if monster.pk in done:
+                return
+            done.add(monster.pk)
+
+            if monster.is_awakened and monster.awakens_from:
+                # Awakened monsters take their slug from the monster they awaken from
+                update(monster.awakens_from)
+
+            previous = [getattr(monster, field) for field in DERIVED_FIELDS]
+            monster.update_derived_fields()
+            changed = [field for field, value in zip(DERIVED_FIELDS, previous) if getattr(monster, field) != value]
+            if monster.pk in selected and changed:
+                updated.append(monster)
+                update_fields.update(changed)
+
+        for monster in monsters.values():
+            update(monster)
+
+        if updated:
+            # Only write fields that changed, each field is a CASE expression over the whole batch
+            self.model._default_manager.using(self.db).bulk_update(updated, sorted(update_fields), batch_size=500)
+
+        return updated
 
 
 class Monster(models.Model, base.Elements, base.Stars, base.Archetype):
@@ -34,7 +110,7 @@ class Monster(models.Model, base.Elements, base.Stars, base.Archetype):
 
     name = models.CharField(max_length=40)
     com2us_id = models.IntegerField(db_index=True, blank=True, null=True, help_text='ID given in game data files')
-    family_id = models.IntegerField(blank=True, null=True, help_text='Identifier that matches same family monsters')
+    family_id = models.IntegerField(db_index=True, blank=True, null=True, help_text='Identifier that matches same family monsters')
     skill_group_id = models.IntegerField(blank=True, null=True, help_text='Identifier that matches same skillup monsters (i.e. Street Figher monsters with C2U counterparts)')
     image_filename = models.CharField(max_length=250, null=True, blank=True)
     element = models.CharField(max_length=10, choices=base.Elements.ELEMENT_CHOICES, default=base.Elements.ELEMENT_FIRE)
@@ -103,33 +179,28 @@ class Monster(models.Model, base.Elements, base.Stars, base.Archetype):
         help_text='Monster which this monster can transform into during battle'
     )
 
-    awaken_mats_fire_low = models.IntegerField(blank=True, default=0)
-    awaken_mats_fire_mid = models.IntegerField(blank=True, default=0)
-    awaken_mats_fire_high = models.IntegerField(blank=True, default=0)
-    awaken_mats_water_low = models.IntegerField(blank=True, default=0)
-    awaken_mats_water_mid = models.IntegerField(blank=True, default=0)
-    awaken_mats_water_high = models.IntegerField(blank=True, default=0)
-    awaken_mats_wind_low = models.IntegerField(blank=True, default=0)
-    awaken_mats_wind_mid = models.IntegerField(blank=True, default=0)
-    awaken_mats_wind_high = models.IntegerField(blank=True, default=0)
-    awaken_mats_light_low = models.IntegerField(blank=True, default=0)
-    awaken_mats_light_mid = models.IntegerField(blank=True, default=0)
-    awaken_mats_light_high = models.IntegerField(blank=True, default=0)
-    awaken_mats_dark_low = models.IntegerField(blank=True, default=0)
-    awaken_mats_dark_mid = models.IntegerField(blank=True, default=0)
-    awaken_mats_dark_high = models.IntegerField(blank=True, default=0)
-    awaken_mats_magic_low = models.IntegerField(blank=True, default=0)
-    awaken_mats_magic_mid = models.IntegerField(blank=True, default=0)
-    awaken_mats_magic_high = models.IntegerField(blank=True, default=0)
+    # Awakening chain, so the forms shown on a detail page can be loaded together
+    chain_base = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='+',
+        help_text='First monster of the awakening chain, if it is not this monster'
+    )
+    chain_position = models.IntegerField(default=0, editable=False, help_text='Awakening steps from the first monster of the chain')
 
     source = models.ManyToManyField('Source', blank=True, help_text='Where this monster can be acquired from')
     farmable = models.BooleanField(default=False, help_text='Monster can be acquired easily without luck')
     fusion_food = models.BooleanField(default=False, help_text='Monster is used as a fusion ingredient')
     bestiary_slug = models.SlugField(max_length=255, editable=False, null=True)
 
+    objects = MonsterQuerySet.as_manager()
+
     def image_url(self):
         if self.image_filename:
-            return mark_safe('<img src="%s" height="42" width="42" loading="lazy" />' % static('herders/images/monsters/' + self.image_filename))
+            return sprites.image_tag('monsters', self.image_filename, alt=self.name, size=42)
         else:
             return 'No Image'
 
@@ -141,9 +212,9 @@ class Monster(models.Model, base.Elements, base.Stars, base.Archetype):
 
     def get_stats(self, grade, level):
         all_stats = {
-            base.Stats.STAT_HP: self._calculate_actual_stat(self.raw_hp, grade, level) * 15,
-            base.Stats.STAT_DEF: self._calculate_actual_stat(self.raw_defense, grade, level),
-            base.Stats.STAT_ATK: self._calculate_actual_stat(self.raw_attack, grade, level),
+            base.Stats.STAT_HP: self.actual_hp(grade, level),
+            base.Stats.STAT_DEF: self.actual_defense(grade, level),
+            base.Stats.STAT_ATK: self.actual_attack(grade, level),
             base.Stats.STAT_SPD: self.speed,
             base.Stats.STAT_CRIT_RATE_PCT: self.crit_rate,
             base.Stats.STAT_CRIT_DMG_PCT: self.crit_damage,
@@ -154,8 +225,6 @@ class Monster(models.Model, base.Elements, base.Stars, base.Archetype):
         return all_stats
 
     def get_stats_for_all_stars(self):
-        from collections import OrderedDict
-
         start_grade = self.base_stars
         stats_list = OrderedDict()
 
@@ -174,56 +243,62 @@ class Monster(models.Model, base.Elements, base.Stars, base.Archetype):
 
         return stats_list
 
+    def stat_curves(self):
+        # HP, ATK and DEF at every grade and level. Calculated together once until the raw stats change.
+        raw_stats = (self.raw_hp, self.raw_attack, self.raw_defense)
+        cached = getattr(self, '_stat_curves', None)
+        if cached is None or cached[0] != raw_stats:
+            stat_table = self._loaded_stat_table()
+            if stat_table:
+                self._stat_curves = raw_stats, np.array(json.loads(stat_table.curves))
+            else:
+                stat_curves.monster_stat_curves([self])
+
+        return self._stat_curves[1]
+
+    def stat_chart_json(self):
+        stat_table = self._loaded_stat_table()
+        if stat_table:
+            return stat_table.chart
+        else:
+            return json.dumps(stat_curves.stat_chart(self))
+
+    def _loaded_stat_table(self):
+        # Stored stat table if it was fetched with the monster and is up to date. Never queries for it, calculating is cheaper.
+        stat_table = Monster.stat_table.related.get_cached_value(self, default=None)
+        if stat_table is None or stat_table.stats_key != MonsterStatTable.stats_key_for(self):
+            return None
+
+        return stat_table
+
     def actual_hp(self, grade, level):
         # Check that base stat exists first
         if not self.raw_hp:
             return None
         else:
-            return self._calculate_actual_stat(self.raw_hp, grade, level) * 15
+            return self._actual_stat(stat_curves.HP, grade, level)
 
     def actual_attack(self, grade=base_stars, level=1):
         # Check that base stat exists first
         if not self.raw_attack:
             return None
         else:
-            return self._calculate_actual_stat(self.raw_attack, grade, level)
+            return self._actual_stat(stat_curves.ATK, grade, level)
 
     def actual_defense(self, grade=base_stars, level=1):
         # Check that base stat exists first
         if not self.raw_defense:
             return None
         else:
-            return self._calculate_actual_stat(self.raw_defense, grade, level)
-
-    @staticmethod
-    def _calculate_actual_stat(stat, grade, level):
-        if stat is None:
-            return None
+            return self._actual_stat(stat_curves.DEF, grade, level)
 
-        # Magic multipliers taken from summoner's war wikia calculator. Used to calculate stats for lvl 1 and lvl MAX
-        magic_multipliers = [
-            {'1': 1.0, 'max': 1.9958},
-            {'1': 1.9958, 'max': 3.03050646},
-            {'1': 3.03050646, 'max': 4.364426603},
-            {'1': 4.364426603, 'max': 5.941390935},
-            {'1': 5.941390935, 'max': 8.072330795},
-            {'1': 8.072330795, 'max': 10.97901633},
-        ]
-
-        max_lvl = 10 + grade * 5
-        stat_lvl_1 = round(stat * magic_multipliers[grade - 1]['1'], 0)
-        stat_lvl_max = round(stat * magic_multipliers[grade - 1]['max'], 0)
-
-        if level == 1:
-            return int(stat_lvl_1)
-        elif level == max_lvl:
-            return int(stat_lvl_max)
-        else:
-            # Use exponential function in format value=ae^(bx)
-            # a=stat_lvl_1*e^(-b)
-            b_coeff = log(stat_lvl_max / stat_lvl_1) / (max_lvl - 1)
+    def _actual_stat(self, stat, grade, level):
+        if 1 <= grade <= 6 and 1 <= level <= self.max_level_from_stars(grade):
+            return int(self.stat_curves()[stat, grade - 1, level - 1])
 
-            return int(round((stat_lvl_1 * exp(-b_coeff)) * exp(b_coeff * level)))
+        # Outside of the bestiary's grades and levels
+        raw_stat = (self.raw_hp, self.raw_attack, self.raw_defense)[stat]
+        return stat_curves.actual_stat(raw_stat, grade, level) * (15 if stat == stat_curves.HP else 1)
 
     @property
     def base_monster(self):
@@ -237,137 +312,109 @@ class Monster(models.Model, base.Elements, base.Stars, base.Archetype):
         has_awakened_version = Q(can_awaken=True) & Q(awakens_to__isnull=False)
         return Monster.objects.filter(should_be_shown, family_id=self.family_id).exclude(has_awakened_version).order_by('com2us_id')
 
+    def shown_in_family(self):
+        # Same conditions as monster_family(), for monsters that are already loaded
+        should_be_shown = self.obtainable or self.transforms_to_id is not None
+        has_awakened_version = self.can_awaken and self.awakens_to_id is not None
+        return should_be_shown and not has_awakened_version
+
+    @classmethod
+    def detail_page_monsters(cls, monster):
+        """Awakening chain and family list for the monster's detail page, loaded with one query.
+
+        Relationships between the loaded monsters are linked in memory, and transforms_to and the
+        leader skill are joined. Relies on the chain fields set by update_derived_fields().
+        """
+        chain_base_id = monster.chain_base_id or monster.pk
+        related = Q(pk=chain_base_id) | Q(chain_base_id=chain_base_id)
+        if monster.family_id is not None:
+            related |= Q(family_id=monster.family_id)
+
+        loaded = {mon.pk: mon for mon in cls.objects.filter(related).select_related('transforms_to', 'leader_skill')}
+        for mon in loaded.values():
+            for field in ('awakens_from', 'awakens_to', 'transforms_to'):
+                related_id = getattr(mon, f'{field}_id')
+                if related_id in loaded:
+                    setattr(mon, field, loaded[related_id])
+
+        chain = sorted(
+            [mon for mon in loaded.values() if chain_base_id in (mon.pk, mon.chain_base_id)],
+            key=lambda mon: mon.chain_position,
+        )
+        family = sorted(
+            [mon for mon in loaded.values() if monster.family_id is not None and mon.family_id == monster.family_id and mon.shown_in_family()],
+            key=lambda mon: mon.com2us_id,
+        )
+        return chain, family
+
+    @cached_property
+    def awakening_materials(self):
+        """Essences needed to awaken this monster as {element: {size: quantity}}, from its AwakenCost rows.
+
+        Uses prefetched awakencost_set__item when available.
+        """
+        costs = self.awakencost_set.all()
+        if 'awakencost_set' not in getattr(self, '_prefetched_objects_cache', {}):
+            costs = costs.select_related('item')
+
+        return _essence_quantities({
+            cost.item.com2us_id: cost.quantity for cost in costs if cost.item.category == GameItem.CATEGORY_ESSENCE
+        })
+
     def get_awakening_materials(self):
-        mats = OrderedDict()
-        mats['magic'] = OrderedDict()
-        mats['magic']['low'] = self.awaken_mats_magic_low
-        mats['magic']['mid'] = self.awaken_mats_magic_mid
-        mats['magic']['high'] = self.awaken_mats_magic_high
-        mats['fire'] = OrderedDict()
-        mats['fire']['low'] = self.awaken_mats_fire_low
-        mats['fire']['mid'] = self.awaken_mats_fire_mid
-        mats['fire']['high'] = self.awaken_mats_fire_high
-        mats['water'] = OrderedDict()
-        mats['water']['low'] = self.awaken_mats_water_low
-        mats['water']['mid'] = self.awaken_mats_water_mid
-        mats['water']['high'] = self.awaken_mats_water_high
-        mats['wind'] = OrderedDict()
-        mats['wind']['low'] = self.awaken_mats_wind_low
-        mats['wind']['mid'] = self.awaken_mats_wind_mid
-        mats['wind']['high'] = self.awaken_mats_wind_high
-        mats['light'] = OrderedDict()
-        mats['light']['low'] = self.awaken_mats_light_low
-        mats['light']['mid'] = self.awaken_mats_light_mid
-        mats['light']['high'] = self.awaken_mats_light_high
-        mats['dark'] = OrderedDict()
-        mats['dark']['low'] = self.awaken_mats_dark_low
-        mats['dark']['mid'] = self.awaken_mats_dark_mid
-        mats['dark']['high'] = self.awaken_mats_dark_high
-
-        return mats
-
-    def clean(self):
-        # Update null values
-        if self.awaken_mats_fire_high is None:
-            self.awaken_mats_fire_high = 0
-        if self.awaken_mats_fire_mid is None:
-            self.awaken_mats_fire_mid = 0
-        if self.awaken_mats_fire_low is None:
-            self.awaken_mats_fire_low = 0
-        if self.awaken_mats_water_high is None:
-            self.awaken_mats_water_high = 0
-        if self.awaken_mats_water_mid is None:
-            self.awaken_mats_water_mid = 0
-        if self.awaken_mats_water_low is None:
-            self.awaken_mats_water_low = 0
-        if self.awaken_mats_wind_high is None:
-            self.awaken_mats_wind_high = 0
-        if self.awaken_mats_wind_mid is None:
-            self.awaken_mats_wind_mid = 0
-        if self.awaken_mats_wind_low is None:
-            self.awaken_mats_wind_low = 0
-        if self.awaken_mats_light_high is None:
-            self.awaken_mats_light_high = 0
-        if self.awaken_mats_light_mid is None:
-            self.awaken_mats_light_mid = 0
-        if self.awaken_mats_light_low is None:
-            self.awaken_mats_light_low = 0
-        if self.awaken_mats_dark_high is None:
-            self.awaken_mats_dark_high = 0
-        if self.awaken_mats_dark_mid is None:
-            self.awaken_mats_dark_mid = 0
-        if self.awaken_mats_dark_low is None:
-            self.awaken_mats_dark_low = 0
-        if self.awaken_mats_magic_high is None:
-            self.awaken_mats_magic_high = 0
-        if self.awaken_mats_magic_mid is None:
-            self.awaken_mats_magic_mid = 0
-        if self.awaken_mats_magic_low is None:
-            self.awaken_mats_magic_low = 0
-
-        super(Monster, self).clean()
+        return self.awakening_materials
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        monster = super(Monster, cls).from_db(db, field_names, values)
+        monster._saved_awakened_form_inputs = monster._awakened_form_inputs()
+        return monster
+
+    def refresh_from_db(self, *args, **kwargs):
+        super(Monster, self).refresh_from_db(*args, **kwargs)
+        self._saved_awakened_form_inputs = self._awakened_form_inputs()
+
+    def _awakened_form_inputs(self):
+        # Values the awakened forms' derived fields are calculated from, or None if any are deferred
+        try:
+            return tuple(self.__dict__[field] for field in AWAKENED_FORM_INPUTS)
+        except KeyError:
+            return None
 
     def save(self, *args, **kwargs):
-        # Update null values
-        if self.awaken_mats_fire_high is None:
-            self.awaken_mats_fire_high = 0
-        if self.awaken_mats_fire_mid is None:
-            self.awaken_mats_fire_mid = 0
-        if self.awaken_mats_fire_low is None:
-            self.awaken_mats_fire_low = 0
-        if self.awaken_mats_water_high is None:
-            self.awaken_mats_water_high = 0
-        if self.awaken_mats_water_mid is None:
-            self.awaken_mats_water_mid = 0
-        if self.awaken_mats_water_low is None:
-            self.awaken_mats_water_low = 0
-        if self.awaken_mats_wind_high is None:
-            self.awaken_mats_wind_high = 0
-        if self.awaken_mats_wind_mid is None:
-            self.awaken_mats_wind_mid = 0
-        if self.awaken_mats_wind_low is None:
-            self.awaken_mats_wind_low = 0
-        if self.awaken_mats_light_high is None:
-            self.awaken_mats_light_high = 0
-        if self.awaken_mats_light_mid is None:
-            self.awaken_mats_light_mid = 0
-        if self.awaken_mats_light_low is None:
-            self.awaken_mats_light_low = 0
-        if self.awaken_mats_dark_high is None:
-            self.awaken_mats_dark_high = 0
-        if self.awaken_mats_dark_mid is None:
-            self.awaken_mats_dark_mid = 0
-        if self.awaken_mats_dark_low is None:
-            self.awaken_mats_dark_low = 0
-        if self.awaken_mats_magic_high is None:
-            self.awaken_mats_magic_high = 0
-        if self.awaken_mats_magic_mid is None:
-            self.awaken_mats_magic_mid = 0
-        if self.awaken_mats_magic_low is None:
-            self.awaken_mats_magic_low = 0
+        self.update_derived_fields()
+        super(Monster, self).save(*args, **kwargs)
+
+        # Most saves don't change anything the awakened forms use, so they aren't looked up
+        inputs = self._awakened_form_inputs()
+        if inputs is None or inputs != getattr(self, '_saved_awakened_form_inputs', None):
+            self.update_awakened_forms()
+        self._saved_awakened_form_inputs = inputs
+
+    def update_awakened_forms(self):
+        # Awakened forms copy their slug and awakening chain from this monster, so save the ones that
+        # changed. Saving them continues down the chain.
+        for monster in Monster.objects.filter(awakens_from=self).exclude(pk=self.pk):
+            monster.awakens_from = self
+            previous = [getattr(monster, field) for field in DERIVED_FIELDS]
+            monster.update_derived_fields()
+            changed = [field for field, value in zip(DERIVED_FIELDS, previous) if getattr(monster, field) != value]
+            if changed:
+                monster.save(update_fields=changed)
+
+    def update_derived_fields(self):
+        base_level = self.max_level_from_stars(self.base_stars)
 
         if self.raw_hp:
-            self.base_hp = self._calculate_actual_stat(
-                self.raw_hp,
-                self.base_stars,
-                self.max_level_from_stars(self.base_stars)
-            ) * 15
+            self.base_hp = self.actual_hp(self.base_stars, base_level)
             self.max_lvl_hp = self.actual_hp(6, 40)
 
         if self.raw_attack:
-            self.base_attack = self._calculate_actual_stat(
-                self.raw_attack,
-                self.base_stars,
-                self.max_level_from_stars(self.base_stars)
-            )
+            self.base_attack = self.actual_attack(self.base_stars, base_level)
             self.max_lvl_attack = self.actual_attack(6, 40)
 
         if self.raw_defense:
-            self.base_defense = self._calculate_actual_stat(
-                self.raw_defense,
-                self.base_stars,
-                self.max_level_from_stars(self.base_stars)
-            )
+            self.base_defense = self.actual_defense(self.base_stars, base_level)
             self.max_lvl_defense = self.actual_defense(6, 40)
 
         if self.is_awakened and self.awakens_from:
@@ -378,7 +425,13 @@ class Monster(models.Model, base.Elements, base.Stars, base.Archetype):
             else:
                 self.bestiary_slug = slugify(" ".join([str(self.com2us_id), self.element, self.name]))
 
-        super(Monster, self).save(*args, **kwargs)
+        chain_base = self.base_monster
+        self.chain_base_id = None if chain_base is self else chain_base.pk
+        self.chain_position = 0
+        mon = self
+        while mon is not chain_base:
+            mon = mon.awakens_from
+            self.chain_position += 1
 
     class Meta:
         ordering = ['name', 'element']
@@ -392,6 +445,17 @@ class Monster(models.Model, base.Elements, base.Stars, base.Archetype):
             return self.name + ' (' + self.element.capitalize() + ')'
 
 
+# Fields set by Monster.update_derived_fields()
+DERIVED_FIELDS = [
+    'base_hp', 'base_attack', 'base_defense', 'max_lvl_hp', 'max_lvl_attack', 'max_lvl_defense', 'bestiary_slug',
+    'chain_base_id', 'chain_position',
+]
+
+# Fields of a monster that the derived fields of its awakened forms are calculated from. The slug covers
+# the name, element and awakens_to, and the chain base covers awakens_from.
+AWAKENED_FORM_INPUTS = ['bestiary_slug', 'chain_base_id', 'obtainable']
+
+
 class AwakenCost(ItemQuantity):
     monster = models.ForeignKey(Monster, on_delete=models.CASCADE)
 
@@ -411,12 +475,60 @@ class MonsterCraftCost(ItemQuantity):
     monster = models.ForeignKey(Monster, on_delete=models.CASCADE)
 
 
+class MonsterStatTable(models.Model):
+    # Stats of a monster at every grade and level and its stat chart, calculated when game data is parsed
+    monster = models.OneToOneField(Monster, on_delete=models.CASCADE, primary_key=True, related_name='stat_table')
+    stats_key = models.CharField(max_length=100, help_text='Monster values the table was calculated from')
+    curves = models.TextField(help_text='JSON array of HP, ATK and DEF indexed by stat, grade and level')
+    chart = models.TextField(help_text='Highcharts JSON of stat growth by level')
+
+    def __str__(self):
+        return f'{self.monster} stat table'
+
+    @staticmethod
+    def stats_key_for(monster):
+        return f'{stat_curves.CURVE_VERSION}:{monster.raw_hp},{monster.raw_attack},{monster.raw_defense},{monster.natural_stars}'
+
+
+def _awakening_cost_sums(prefix='', owned_ingredients=None):
+    # Essences needed to awaken each ingredient, which are the AwakenCost rows of the monster it awakens from
+    cost = f'{prefix}awakens_from__awakencost'
+    if owned_ingredients:
+        excluded = ~Q(**{f'{prefix}pk__in': [o.monster.pk for o in owned_ingredients]})
+    else:
+        excluded = Q()
+
+    return {
+        f'awakening_cost_{element}_{size}': Coalesce(Sum(f'{cost}__quantity', filter=excluded & Q(**{
+            f'{cost}__item__category': GameItem.CATEGORY_ESSENCE,
+            f'{cost}__item__com2us_id': ESSENCE_MAP[element][size],
+        })), 0)
+        for element, size in AWAKENING_ESSENCES
+    }
+
+
+class FusionQuerySet(models.QuerySet):
+    def with_awakening_cost(self, owned_ingredients=None):
+        """Annotate the awakening cost and sub-fusion availability of each fusion in the same query.
+
+        total_awakening_cost() and sub_fusion_available() of the fetched fusions use the annotations,
+        so listing every fusion takes a constant number of queries.
+        """
+        has_sub_fusion = Monster.objects.filter(fusion_ingredient_for=OuterRef('pk'), awakens_from__fusion__isnull=False)
+        return self.annotate(
+            has_sub_fusion=Exists(has_sub_fusion),
+            **_awakening_cost_sums('ingredients__', owned_ingredients),
+        )
+
+
 class Fusion(models.Model):
     product = models.OneToOneField('Monster', on_delete=models.CASCADE, related_name='fusion')
     cost = models.IntegerField()
     ingredients = models.ManyToManyField('Monster', related_name='fusion_ingredient_for')
     meta_order = models.IntegerField(db_index=True, default=0)
 
+    objects = FusionQuerySet.as_manager()
+
     def __str__(self):
         return str(self.product) + ' Fusion'
 
@@ -424,66 +536,20 @@ class Fusion(models.Model):
         ordering = ['meta_order']
 
     def sub_fusion_available(self):
-        return Fusion.objects.filter(product__in=self.ingredients.values_list('awakens_from__pk', flat=True)).exists()
+        if hasattr(self, 'has_sub_fusion'):
+            return self.has_sub_fusion
 
-    def total_awakening_cost(self, owned_ingredients=None):
-        cost = {
-            'magic': {
-                'low': 0,
-                'mid': 0,
-                'high': 0,
-            },
-            'fire': {
-                'low': 0,
-                'mid': 0,
-                'high': 0,
-            },
-            'water': {
-                'low': 0,
-                'mid': 0,
-                'high': 0,
-            },
-            'wind': {
-                'low': 0,
-                'mid': 0,
-                'high': 0,
-            },
-            'light': {
-                'low': 0,
-                'mid': 0,
-                'high': 0,
-            },
-            'dark': {
-                'low': 0,
-                'mid': 0,
-                'high': 0,
-            },
-        }
+        return self.ingredients.filter(awakens_from__fusion__isnull=False).exists()
 
-        if owned_ingredients:
-            qs = self.ingredients.exclude(pk__in=[o.monster.pk for o in owned_ingredients])
+    def total_awakening_cost(self, owned_ingredients=None):
+        # Annotated by FusionQuerySet.with_awakening_cost(), which also applies its owned ingredients
+        if owned_ingredients is None and hasattr(self, 'awakening_cost_magic_low'):
+            totals = {key: getattr(self, key) for key in _awakening_cost_sums()}
         else:
-            qs = self.ingredients.all()
-
-        for ingredient in qs:
-            if ingredient.awakens_from:
-                cost['magic']['low'] += ingredient.awakens_from.awaken_mats_magic_low
-                cost['magic']['mid'] += ingredient.awakens_from.awaken_mats_magic_mid
-                cost['magic']['high'] += ingredient.awakens_from.awaken_mats_magic_high
-                cost['fire']['low'] += ingredient.awakens_from.awaken_mats_fire_low
-                cost['fire']['mid'] += ingredient.awakens_from.awaken_mats_fire_mid
-                cost['fire']['high'] += ingredient.awakens_from.awaken_mats_fire_high
-                cost['water']['low'] += ingredient.awakens_from.awaken_mats_water_low
-                cost['water']['mid'] += ingredient.awakens_from.awaken_mats_water_mid
-                cost['water']['high'] += ingredient.awakens_from.awaken_mats_water_high
-                cost['wind']['low'] += ingredient.awakens_from.awaken_mats_wind_low
-                cost['wind']['mid'] += ingredient.awakens_from.awaken_mats_wind_mid
-                cost['wind']['high'] += ingredient.awakens_from.awaken_mats_wind_high
-                cost['light']['low'] += ingredient.awakens_from.awaken_mats_light_low
-                cost['light']['mid'] += ingredient.awakens_from.awaken_mats_light_mid
-                cost['light']['high'] += ingredient.awakens_from.awaken_mats_light_high
-                cost['dark']['low'] += ingredient.awakens_from.awaken_mats_dark_low
-                cost['dark']['mid'] += ingredient.awakens_from.awaken_mats_dark_mid
-                cost['dark']['high'] += ingredient.awakens_from.awaken_mats_dark_high
+            totals = self.ingredients.aggregate(**_awakening_cost_sums(owned_ingredients=owned_ingredients))
+
+        cost = {}
+        for element, size in AWAKENING_ESSENCES:
+            cost.setdefault(element, {})[size] = totals[f'awakening_cost_{element}_{size}']
 
         return cost
@@ -1,7 +1,10 @@
+import json
+
 from django.contrib.staticfiles.templatetags.staticfiles import static
 from django.db import models
 from django.utils.safestring import mark_safe
 
+from bestiary import formulas, sprites
 from . import base
 from .items import GameItem, ItemQuantity
 from .monsters import Monster
@@ -22,6 +25,7 @@ class Skill(models.Model):
     icon_filename = models.CharField(max_length=100, null=True, blank=True)
     multiplier_formula = models.TextField(null=True, blank=True, help_text='Parsed multiplier formula')
     multiplier_formula_raw = models.CharField(max_length=150, null=True, blank=True, help_text='Multiplier formula given in game data files')
+    multiplier_formula_ast = models.TextField(null=True, blank=True, help_text='Parsed multiplier formula as a JSON expression tree')
     scaling_stats = models.ManyToManyField('ScalingStat', blank=True, help_text='Monster stats which this skill scales on')
 
     other_skill = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, help_text='Twin Angel mechanic')
@@ -31,10 +35,17 @@ class Skill(models.Model):
 
     def image_url(self):
         if self.icon_filename:
-            return mark_safe('<img src="%s" height="42" width="42" loading="lazy" />' % static('herders/images/skills/' + self.icon_filename))
+            return sprites.image_tag('skills', self.icon_filename, alt=self.name, size=42)
         else:
             return 'No Image'
 
+    def multiplier_function(self):
+        # Callable taking each scaling stat as a keyword argument. Accepts NumPy arrays to evaluate many values at once.
+        if not self.multiplier_formula_ast:
+            return None
+
+        return formulas.compile_expr(json.loads(self.multiplier_formula_ast)['expr'])
+
     def level_progress_description_list(self):
         return self.level_progress_description.splitlines()
 
@@ -62,13 +73,14 @@ class Skill(models.Model):
         verbose_name_plural = 'Skills'
 
     def effects_distinct(self):
-        c2us_ids = []
+        # Uses prefetched effects when there are any
+        c2us_ids = set()
         effects_distinct = []
         for effect in self.effect.all():
             if effect.pk not in c2us_ids:
-                c2us_ids.append(effect.pk)
+                c2us_ids.add(effect.pk)
                 effects_distinct.append(effect)
-        
+
         return effects_distinct
 
     def copy_effects_from(self, other_skill):
@@ -238,9 +250,7 @@ class LeaderSkill(models.Model):
         return 'leader_skill_{0}{1}.png'.format(self.get_attribute_display().replace(' ', '_'), suffix)
 
     def image_url(self):
-        return mark_safe('<img src="{}" height="42" width="42" loading="lazy" />'.format(
-            static('herders/images/skills/leader/' + self.icon_filename())
-        ))
+        return sprites.image_tag('skills/leader', self.icon_filename(), size=42)
 
     def __str__(self):
         if self.area == self.AREA_ELEMENT:
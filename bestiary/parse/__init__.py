@@ -1,4 +1,5 @@
 from bestiary.parse import game_data, static
+from .context import ParseContext
 from .dungeons import scenarios, elemental_rifts, rift_raids, secret_dungeons, dimensional_hole
 from .items import craft_materials
 from .monsters import monsters, monster_relationships, monster_crafting
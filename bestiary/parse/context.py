@@ -0,0 +1,99 @@
+from bestiary.models import Monster, Skill, GameItem, LeaderSkill, ScalingStat
+
+
+class ParseContext:
+    """In-memory lookups of bestiary objects shared by all parse stages.
+
+    Loaded once at the start of a parse run so that stages resolve related objects by com2us ID
+    without a query per row. Stages must `add()` any object they create or update so later stages
+    see the current version.
+    """
+
+    def __init__(self):
+        self.monsters = {}
+        self.skills = {}
+        self.game_items = {}
+        self.leader_skills = {}
+        self.scaling_stats = {}
+
+    @classmethod
+    def load(cls):
+        context = cls()
+
+        monsters = list(Monster.objects.all())
+        monsters_by_pk = {monster.pk: monster for monster in monsters}
+        for monster in monsters:
+            context.monsters.setdefault(monster.com2us_id, monster)
+
+            # Share instances between related monsters so derived fields like bestiary_slug
+            # are calculated from current values without a query per monster
+            for field in ('awakens_from', 'awakens_to', 'transforms_to'):
+                related_id = getattr(monster, f'{field}_id')
+                if related_id in monsters_by_pk:
+                    setattr(monster, field, monsters_by_pk[related_id])
+
+        for skill in Skill.objects.all():
+            context.skills.setdefault(skill.com2us_id, skill)
+
+        for item in GameItem.objects.all():
+            context.game_items[(item.category, item.com2us_id)] = item
+
+        for leader_skill in LeaderSkill.objects.all():
+            context.leader_skills.setdefault(cls._leader_skill_key(leader_skill), leader_skill)
+
+        for stat in ScalingStat.objects.all():
+            context.scaling_stats.setdefault(stat.com2us_desc, stat)
+
+        return context
+
+    def add(self, obj):
+        if isinstance(obj, Monster):
+            self.monsters[obj.com2us_id] = obj
+        elif isinstance(obj, Skill):
+            self.skills[obj.com2us_id] = obj
+        elif isinstance(obj, GameItem):
+            self.game_items[(obj.category, obj.com2us_id)] = obj
+        elif isinstance(obj, LeaderSkill):
+            self.leader_skills[self._leader_skill_key(obj)] = obj
+        elif isinstance(obj, ScalingStat):
+            self.scaling_stats[obj.com2us_desc] = obj
+        else:
+            raise TypeError(f'Cannot add {type(obj).__name__} to parse context')
+
+        return obj
+
+    def monster(self, com2us_id):
+        try:
+            return self.monsters[com2us_id]
+        except KeyError:
+            raise Monster.DoesNotExist(f'Monster with com2us_id {com2us_id} does not exist') from None
+
+    def skill(self, com2us_id):
+        try:
+            return self.skills[com2us_id]
+        except KeyError:
+            raise Skill.DoesNotExist(f'Skill with com2us_id {com2us_id} does not exist') from None
+
+    def game_item(self, category, com2us_id):
+        try:
+            return self.game_items[(category, com2us_id)]
+        except KeyError:
+            raise GameItem.DoesNotExist(f'GameItem with category {category} and com2us_id {com2us_id} does not exist') from None
+
+    def scaling_stat(self, com2us_desc):
+        try:
+            return self.scaling_stats[com2us_desc]
+        except KeyError:
+            raise ScalingStat.DoesNotExist(f'ScalingStat {com2us_desc} does not exist') from None
+
+    def leader_skill(self, attribute, amount, area, element):
+        # Equivalent of LeaderSkill.objects.get_or_create()
+        key = (attribute, amount, area, element)
+        if key not in self.leader_skills:
+            self.add(LeaderSkill.objects.create(attribute=attribute, amount=amount, area=area, element=element))
+
+        return self.leader_skills[key]
+
+    @staticmethod
+    def _leader_skill_key(leader_skill):
+        return leader_skill.attribute, leader_skill.amount, leader_skill.area, leader_skill.element
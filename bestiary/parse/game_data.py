@@ -1,41 +1,60 @@
 import base64
-import binascii
 import csv
+import hashlib
 import json
+import mmap
+import os
+import pickle
+import re
+import struct
+import threading
 import zlib
+from collections.abc import Mapping, MutableMapping
 
-from Crypto.Cipher import AES
-from bitstring import ConstBitStream, ReadError
+from bitstring import ConstBitStream
 from django.conf import settings
 
 
 class JokerCipher:
-    cipher = AES.new(
-        bytes.fromhex(settings.JOKER_CONTAINER_KEY),
-        AES.MODE_CBC,
-        bytes.fromhex(settings.JOKER_CONTAINER_IV),
-    )
+    cipher = None
 
     @staticmethod
     def decrypt(enc):
-        return JokerCipher._unpad(JokerCipher.cipher.decrypt(enc))
+        return JokerCipher._unpad(JokerCipher._get_cipher().decrypt(enc))
 
     @staticmethod
     def _unpad(s):
         # Strip null data padded during encryption
         return s.rstrip(b'\x00')
 
+    @staticmethod
+    def _get_cipher():
+        if JokerCipher.cipher is None:
+            JokerCipher.cipher = _new_aes_cipher(settings.JOKER_CONTAINER_KEY, settings.JOKER_CONTAINER_IV)
+
+        return JokerCipher.cipher
+
 
 class DefaultCipher:
-    cipher = AES.new(
-        bytes.fromhex(settings.SUMMONERS_WAR_KEY),
-        AES.MODE_CBC,
-        bytes.fromhex(settings.SUMMONERS_WAR_IV),
-    )
+    cipher = None
 
     @staticmethod
     def decrypt(enc):
-        return DefaultCipher.cipher.decrypt(enc)
+        return DefaultCipher._get_cipher().decrypt(enc)
+
+    @staticmethod
+    def _get_cipher():
+        if DefaultCipher.cipher is None:
+            DefaultCipher.cipher = _new_aes_cipher(settings.SUMMONERS_WAR_KEY, settings.SUMMONERS_WAR_IV)
+
+        return DefaultCipher.cipher
+
+
+def _new_aes_cipher(key, iv):
+    # pycryptodome takes a large share of the package import time, so it is only loaded once decrypting
+    from Crypto.Cipher import AES
+
+    return AES.new(bytes.fromhex(key), AES.MODE_CBC, bytes.fromhex(iv))
 
 
 class JokerContainerFile:
@@ -101,6 +120,218 @@ def try_json(value):
         return value
 
 
+class _DecodeCache:
+    """On-disk cache of decoded game data, keyed by the content hash of the source file.
+
+    Filenames also hold a hash of this module, so entries pickled by a different version of the
+    decoding code or table classes are never loaded. Stale entries for the same source file,
+    including those of older code, are removed when a new entry is written. Each source file is
+    only hashed again when its size or modification time changes.
+    """
+    directory = 'bestiary/parse/com2us_data/cache'
+    HASHED_FILENAME = re.compile(r'^(?P<name>.+)_[0-9a-f]{64}(_[0-9a-f]{12})?\.(?P<extension>\w+)$')
+    _digests = {}
+    _decoder_hash = None
+
+    @staticmethod
+    def path(source_filename, extension):
+        stat = os.stat(source_filename)
+        file_key = (stat.st_size, stat.st_mtime_ns)
+        cached = _DecodeCache._digests.get(source_filename)
+
+        if cached is None or cached[0] != file_key:
+            with open(source_filename, 'rb') as f:
+                cached = (file_key, hashlib.sha256(f.read()).hexdigest())
+            _DecodeCache._digests[source_filename] = cached
+
+        digest = cached[1]
+        name = os.path.splitext(os.path.basename(source_filename))[0]
+        return os.path.join(_DecodeCache.directory, f'{name}_{digest}_{_DecodeCache.decoder_hash()}.{extension}')
+
+    @staticmethod
+    def decoder_hash():
+        if _DecodeCache._decoder_hash is None:
+            with open(__file__, 'rb') as f:
+                _DecodeCache._decoder_hash = hashlib.sha256(f.read()).hexdigest()[:12]
+
+        return _DecodeCache._decoder_hash
+
+    @staticmethod
+    def load_bytes(path):
+        # Memory mapped so the decoded data is paged in on demand instead of read up front
+        if not os.path.exists(path):
+            return None
+
+        with open(path, 'rb') as f:
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @staticmethod
+    def store_bytes(path, data):
+        _DecodeCache._write(path, data)
+
+    @staticmethod
+    def load_object(path):
+        if not os.path.exists(path):
+            return None
+
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    @staticmethod
+    def store_object(path, obj):
+        _DecodeCache._write(path, pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+
+    @staticmethod
+    def _write(path, data):
+        os.makedirs(_DecodeCache.directory, exist_ok=True)
+        hashed = _DecodeCache.HASHED_FILENAME.match(os.path.basename(path))
+
+        if hashed:
+            for entry in os.scandir(_DecodeCache.directory):
+                stale = _DecodeCache.HASHED_FILENAME.match(entry.name)
+                if stale and stale.group('name', 'extension') == hashed.group('name', 'extension'):
+                    os.remove(entry.path)
+
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+
+class _Table(Mapping):
+    """Game data table stored as raw string columns.
+
+    Cells are only decoded with `try_json` when their column is first accessed, and the decoded
+    column is kept for subsequent lookups. Rows are accessed by the value of the first column.
+
+    Secondary indexes are built in a single pass over the decoded column on first use and reused
+    afterwards. They reflect the game data as decoded, not values assigned to rows by errata.
+
+    Parse stages share tables between threads, so lazily built values are only published with
+    `dict.setdefault` and every thread sees the same column, index and row.
+    """
+
+    def __init__(self, column_headers, rows):
+        self.column_headers = column_headers
+        self._column_idx = {header: col for col, header in enumerate(column_headers)}
+        self._raw_columns = [[] for _ in column_headers]
+        self._columns = {}
+        self._rows = {}
+        self._indexes = {}
+
+        for row in rows:
+            for col, raw_columns in enumerate(self._raw_columns):
+                raw_columns.append(row[col] if col < len(row) else _MISSING)
+
+        self._row_idx = {key: idx for idx, key in enumerate(self.column(column_headers[0]))}
+
+    def column(self, header):
+        if header not in self._columns:
+            self._columns.setdefault(header, [
+                value if value is _MISSING else try_json(value)
+                for value in self._raw_columns[self._column_idx[header]]
+            ])
+
+        return self._columns[header]
+
+    def index(self, header):
+        """Map of each value in a column to the keys of the rows containing it, in table order."""
+        if ('index', header) not in self._indexes:
+            index = {}
+            for key, value in zip(self._row_keys(), self.column(header)):
+                if value is not _MISSING:
+                    index.setdefault(value, []).append(key)
+
+            self._indexes.setdefault(('index', header), index)
+
+        return self._indexes[('index', header)]
+
+    def inverted_index(self, header):
+        """Map of each element of a list column to `(row key, position in list)` pairs, in table order."""
+        if ('inverted', header) not in self._indexes:
+            index = {}
+            for key, values in zip(self._row_keys(), self.column(header)):
+                if isinstance(values, list):
+                    for position, value in enumerate(values):
+                        index.setdefault(value, []).append((key, position))
+
+            self._indexes.setdefault(('inverted', header), index)
+
+        return self._indexes[('inverted', header)]
+
+    def _row_keys(self):
+        return self.column(self.column_headers[0])
+
+    def __getitem__(self, key):
+        if key not in self._rows:
+            # Rows hold errata overrides, so a row must never be replaced once published
+            self._rows.setdefault(key, _TableRow(self, self._row_idx[key]))
+
+        return self._rows[key]
+
+    def __iter__(self):
+        return iter(self._row_idx)
+
+    def __len__(self):
+        return len(self._row_idx)
+
+    def __contains__(self, key):
+        return key in self._row_idx
+
+
+class _TableRow(MutableMapping):
+    """Single row of a `_Table`. Assigned values override the table data for this row only."""
+
+    def __init__(self, table, idx):
+        self._table = table
+        self._idx = idx
+        self._overrides = {}
+
+    def __getitem__(self, header):
+        if header in self._overrides:
+            return self._overrides[header]
+
+        try:
+            value = self._table.column(header)[self._idx]
+        except KeyError:
+            raise KeyError(header) from None
+
+        if value is _MISSING:
+            raise KeyError(header)
+
+        return value
+
+    def __setitem__(self, header, value):
+        self._overrides[header] = value
+
+    def __delitem__(self, header):
+        raise TypeError('Columns cannot be removed from a game data table row')
+
+    def __iter__(self):
+        for header in self._table.column_headers:
+            if header in self._overrides or self._table._raw_columns[self._table._column_idx[header]][self._idx] is not _MISSING:
+                yield header
+
+        for header in self._overrides:
+            if header not in self._table._column_idx:
+                yield header
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class _Missing:
+    # Pickled by reference so cached tables still compare identical to the module level sentinel
+    def __reduce__(self):
+        return '_MISSING'
+
+
+_MISSING = _Missing()
+
+
 class _TableDefs:
     # Known table definitions
     WIZARD_XP_REQUIREMENTS = 1
@@ -271,12 +502,16 @@ class _LocalValueData:
     _num_tables = None
     _table_offsets = {}
     _decrypted_data = None
+    # Held while loading anything shared between parse stage threads. Values are built locally and
+    # only assigned once complete, so the unlocked fast paths never see partially loaded data.
+    _lock = threading.RLock()
 
     # Byte offsets for key locations in file
     VERSION_POS = 0x0
-    VERSION_LEN = 0x18 * 8
-    TABLE_COUNT_POS = 0x24 * 8
-    TABLE_DEFS_POS = 0x34 * 8
+    VERSION_LEN = 0x18
+    TABLE_COUNT_POS = 0x24
+    TABLE_DEFS_POS = 0x34
+    TABLE_DEF = struct.Struct('<3i')  # table number, start offset, end offset
     TABLE_START_POS = None  # Must be processed after loading table definitions
 
     def __getattr__(self, item):
@@ -286,7 +521,7 @@ class _LocalValueData:
 
     def __getitem__(self, key):
         if key not in _LocalValueData._tables:
-            _LocalValueData._tables[key] = _LocalValueData._get_table(key)
+            return _LocalValueData._get_table(key)
 
         return _LocalValueData._tables[key]
 
@@ -301,64 +536,100 @@ class _LocalValueData:
     @staticmethod
     def _get_num_tables():
         if _LocalValueData._num_tables is None:
-            file = _LocalValueData._get_raw_data()
-            file.pos = _LocalValueData.TABLE_COUNT_POS
-            _LocalValueData._num_tables = file.read(f'intle:32') - 1
+            raw = _LocalValueData._get_raw_data()
+            try:
+                num_tables = struct.unpack_from('<i', raw, _LocalValueData.TABLE_COUNT_POS)[0] - 1
+            except struct.error as e:
+                raise _LocalValueData._format_error('table count', _LocalValueData.TABLE_COUNT_POS, e) from e
+
+            _LocalValueData._num_tables = num_tables
 
         return _LocalValueData._num_tables
 
     @staticmethod
     def _get_table(key):
-        if key not in _LocalValueData._tables:
-            start, end = _LocalValueData._get_table_offsets(key)
-            entire_table = _LocalValueData._get_table_string(start, end)
-            _LocalValueData._tables[key] = _LocalValueData._parse_table(entire_table)
+        with _LocalValueData._lock:
+            if key not in _LocalValueData._tables:
+                cache_path = _DecodeCache.path(_LocalValueData.filename, f'table{key}')
+                table = _DecodeCache.load_object(cache_path)
+
+                if table is None:
+                    start, end = _LocalValueData._get_table_offsets(key)
+                    entire_table = _LocalValueData._get_table_string(start, end)
+                    table = _LocalValueData._parse_table(entire_table)
+                    _DecodeCache.store_object(cache_path, table)
+
+                _LocalValueData._tables[key] = table
 
         return _LocalValueData._tables[key]
 
     @staticmethod
     def _get_table_string(start, end):
-        f = _LocalValueData._get_raw_data()
-        f.pos = _LocalValueData.TABLE_START_POS + start * 8
-        return f.read(f'bytes:{end - start}').decode('utf-8').strip().splitlines()
+        raw = _LocalValueData._get_raw_data()
+        offset = _LocalValueData.TABLE_START_POS
+        if offset + end > len(raw):
+            raise _LocalValueData._format_error('table', offset + start, f'table ends past {len(raw):#x}')
+
+        return str(raw[offset + start:offset + end], 'utf-8').strip().splitlines()
 
     @staticmethod
     def _parse_table(table_string):
-        table = {}
         column_headers = table_string[0].split('\t')
-        for row_string in table_string[1:]:
-            row = row_string.split('\t')
-            row_key = try_json(row[0])
-            table[row_key] = {
-                column_headers[col]: try_json(value) for col, value in enumerate(row)
-            }
-        return table
+        return _Table(column_headers, (row_string.split('\t') for row_string in table_string[1:]))
 
     @staticmethod
     def _get_table_offsets(key):
-        if not _LocalValueData._table_offsets:
-            # Store all table offsets
-            raw = _LocalValueData._get_raw_data()
-            raw.pos = _LocalValueData.TABLE_DEFS_POS
-
-            for x in range(_LocalValueData._get_num_tables()):
-                table_num, start, end = raw.readlist(['intle:32'] * 3)
-                _LocalValueData._table_offsets[table_num] = (start, end)
-
-            _LocalValueData.TABLE_START_POS = raw.pos
+        with _LocalValueData._lock:
+            if not _LocalValueData._table_offsets:
+                # Store all table offsets
+                raw = _LocalValueData._get_raw_data()
+                table_def = _LocalValueData.TABLE_DEF
+                num_tables = _LocalValueData._get_num_tables()
+                pos = _LocalValueData.TABLE_DEFS_POS
+                table_offsets = {}
+
+                try:
+                    for _ in range(num_tables):
+                        table_num, start, end = table_def.unpack_from(raw, pos)
+                        table_offsets[table_num] = (start, end)
+                        pos += table_def.size
+                except struct.error as e:
+                    raise _LocalValueData._format_error('table definition', pos, e) from e
+
+                _LocalValueData.TABLE_START_POS = _LocalValueData.TABLE_DEFS_POS + num_tables * table_def.size
+                _LocalValueData._table_offsets = table_offsets
 
         return _LocalValueData._table_offsets[key]
 
+    @staticmethod
+    def _format_error(section, offset, error):
+        return ValueError(f'{_LocalValueData.filename}: unable to read {section} at offset {offset:#x} of decrypted data ({error})')
+
     @staticmethod
     def _get_raw_data():
-        if _LocalValueData._decrypted_data is None:
-            with open(_LocalValueData.filename, 'rb') as f:
-                # Decryption by Lyrex;
-                # With 6.2.1 update Com2uS changed `localvalue.dat` encryption format, so Joker container is not being used anymore
-                # _LocalValueData._decrypted_data = JokerContainerFile(f).data
-                _LocalValueData._decrypted_data = JokerContainerFile._process_mode_300(f.read())
+        # Decrypted once and shared as a read-only view, so slicing the header, table definitions
+        # and individual tables never copies the underlying buffer.
+        if _LocalValueData._decrypted_data is not None:
+            return _LocalValueData._decrypted_data
+
+        with _LocalValueData._lock:
+            if _LocalValueData._decrypted_data is None:
+                cache_path = _DecodeCache.path(_LocalValueData.filename, 'bin')
+                decrypted_data = _DecodeCache.load_bytes(cache_path)
+
+                if decrypted_data is None:
+                    with open(_LocalValueData.filename, 'rb') as f:
+                        # Decryption by Lyrex;
+                        # With 6.2.1 update Com2uS changed `localvalue.dat` encryption format, so Joker container is not being used anymore
+                        # _LocalValueData._decrypted_data = JokerContainerFile(f).data
+                        decrypted = JokerContainerFile._process_mode_300(f.read())
 
-        return ConstBitStream(_LocalValueData._decrypted_data)
+                    _DecodeCache.store_bytes(cache_path, decrypted)
+                    decrypted_data = memoryview(decrypted)
+
+                _LocalValueData._decrypted_data = decrypted_data
+
+        return _LocalValueData._decrypted_data
 
 
 class _TranslationTables:
@@ -382,29 +653,16 @@ class _TranslationTables:
 class _Strings:
     filename = 'bestiary/parse/com2us_data/text_eng.dat'
     version = None
-    _tables = []
-
-    def __init__(self, *args, **kwargs):
-        if not _Strings._tables:
-            f = _Strings._get_file()
-
-            _Strings.version = f.read('intle:32')
-
-            try:
-                while True:
-                    table_len = f.read('intle:32')
-                    tbl = {}
-
-                    for _ in range(table_len):
-                        str_id, str_len = f.readlist('intle:32, intle:32')
-                        parsed_str = binascii.a2b_hex(f.read('hex:{}'.format(str_len * 8))[:-4])
-                        tbl[str_id] = parsed_str.decode("utf-8").strip()
-
-                    _Strings._tables.append(tbl)
+    _data = None
+    _table_offsets = []
+    _tables = {}
+    # Same locking as `_LocalValueData`
+    _lock = threading.RLock()
 
-            except ReadError:
-                # EOF
-                pass
+    # File layout is a version number followed by tables of `count, (id, length, string)...`
+    INT = struct.Struct('<i')
+    STRING_HEADER = struct.Struct('<2i')
+    STRING_TERMINATOR_LEN = 2
 
     def __getattr__(self, item):
         # Allows access to tables by name instead of index.
@@ -412,14 +670,95 @@ class _Strings:
         return self[value]
 
     def __getitem__(self, key):
+        if key not in _Strings._tables:
+            with _Strings._lock:
+                if key not in _Strings._tables:
+                    cache_path = _DecodeCache.path(_Strings.filename, f'strings{key}')
+                    tbl = _DecodeCache.load_object(cache_path)
+
+                    if tbl is None:
+                        tbl = _Strings._decode_table(*_Strings._get_table_offsets()[key])
+                        _DecodeCache.store_object(cache_path, tbl)
+
+                    _Strings._tables[key] = tbl
+
         return _Strings._tables[key]
 
     def __len__(self):
-        return len(_Strings._tables)
+        return len(_Strings._get_table_offsets())
+
+    @staticmethod
+    def _get_table_offsets():
+        # Deferred until first access so importing the parse package does not touch the game data files
+        if not _Strings._table_offsets:
+            with _Strings._lock:
+                if not _Strings._table_offsets:
+                    cache_path = _DecodeCache.path(_Strings.filename, 'idx')
+                    cached = _DecodeCache.load_object(cache_path)
+
+                    if cached is None:
+                        cached = _Strings._index_tables()
+                        _DecodeCache.store_object(cache_path, cached)
+
+                    _Strings.version, _Strings._table_offsets = cached
+
+        return _Strings._table_offsets
+
+    @staticmethod
+    def _index_tables():
+        # Version and where each table starts, without decoding any of the strings
+        data = _Strings._get_data()
+        int_size = _Strings.INT.size
+        header_size = _Strings.STRING_HEADER.size
+        table_offsets = []
+        pos = 0
+
+        try:
+            version = _Strings.INT.unpack_from(data, pos)[0]
+            pos = int_size
+
+            while pos + int_size <= len(data):
+                num_strings = _Strings.INT.unpack_from(data, pos)[0]
+                table_start = pos + int_size
+                pos = table_start
+
+                for _ in range(num_strings):
+                    str_len = _Strings.STRING_HEADER.unpack_from(data, pos)[1]
+                    pos += header_size + str_len
+
+                if pos > len(data):
+                    # Truncated table at EOF
+                    break
+
+                table_offsets.append((table_start, num_strings))
+        except struct.error as e:
+            raise ValueError(f'{_Strings.filename}: unable to read string table header at offset {pos:#x} ({e})') from e
+
+        return version, table_offsets
+
+    @staticmethod
+    def _decode_table(offset, num_strings):
+        data = _Strings._get_data()
+        header_size = _Strings.STRING_HEADER.size
+        tbl = {}
+
+        for _ in range(num_strings):
+            str_id, str_len = _Strings.STRING_HEADER.unpack_from(data, offset)
+            offset += header_size
+            tbl[str_id] = str(data[offset:offset + str_len - _Strings.STRING_TERMINATOR_LEN], 'utf-8').strip()
+            offset += str_len
+
+        return tbl
 
     @staticmethod
-    def _get_file():
-        return ConstBitStream(filename=_Strings.filename)
+    def _get_data():
+        if _Strings._data is None:
+            with _Strings._lock:
+                if _Strings._data is None:
+                    with open(_Strings.filename, 'rb') as f:
+                        _Strings._data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+        return _Strings._data
 
 
 tables = _LocalValueData()
@@ -1,18 +1,22 @@
 from bestiary.models import GameItem
 from bestiary.parse import game_data
+from .context import ParseContext
+from .util import sync_bestiary_objs
 
 
-def craft_materials():
+def craft_materials(context=None):
+    if context is None:
+        context = ParseContext.load()
+
+    parsed = {}
     for master_id, raw in game_data.tables.CRAFT_MATERIALS.items():
-        defaults = {
+        parsed[(GameItem.CATEGORY_CRAFT_STUFF, master_id)] = {
             'name': game_data.strings.CRAFT_MATERIAL_NAMES.get(master_id, raw['name']),
             'icon': 'craftstuff_icon_{0:04d}_{1:02d}_{2:02d}.png'.format(*raw['thumbnail']),
             'description': game_data.strings.CRAFT_MATERIAL_DESCRIPTIONS.get(master_id, ''),
             'sell_value': raw['sell info']
         }
 
-        GameItem.objects.update_or_create(
-            category=GameItem.CATEGORY_CRAFT_STUFF,
-            com2us_id=master_id,
-            defaults=defaults,
-        )
+    items = sync_bestiary_objs(GameItem, parsed, key_fields=('category', 'com2us_id'), existing=context.game_items)
+    for item in items.values():
+        context.add(item)
@@ -1,11 +1,12 @@
-from django.db.models import Sum
-
-from bestiary.models import Monster, AwakenCost, MonsterCraftCost, Skill, LeaderSkill, Elements, GameItem, Stats
+from bestiary import stat_curves
+from bestiary.models import Monster, AwakenCost, MonsterCraftCost, MonsterStatTable, LeaderSkill, Elements, GameItem, Stats
 from bestiary.models.monsters import AwakenBonusType
 from bestiary.parse import game_data
 
-from .util import update_bestiary_obj
+from .context import ParseContext
+from .util import sync_bestiary_objs, sync_many_to_many
 
+import json
 import math
 
 
@@ -27,14 +28,14 @@ def _which_stat_increases(raw, awakens_to_id):
             return stat, awakening_increase
 
 
-def _get_new_skill(raw, awakens_to_id):
+def _get_new_skill(raw, awakens_to_id, context):
     skill_ids = raw['base skill']
     awakened_skill_ids = game_data.tables.MONSTERS[awakens_to_id]['base skill']
     new_skill_id = (set(awakened_skill_ids) - set(skill_ids)).pop()
-    return Skill.objects.get(com2us_id=new_skill_id)
+    return context.skill(new_skill_id)
 
 
-def _get_leader_skill(master_id):
+def _get_leader_skill(master_id, context):
     raw = game_data.tables.MONSTERS[master_id]
 
     if raw['leader skill']:
@@ -47,13 +48,12 @@ def _get_leader_skill(master_id):
             area_of_effect = LeaderSkill.COM2US_AREA_MAP[raw['leader skill'][1]]
             element = None
 
-        skill, _ = LeaderSkill.objects.get_or_create(
+        return context.leader_skill(
             attribute=stat,
             amount=value,
             area=area_of_effect,
             element=element,
         )
-        return skill
     elif raw['leaderskill type']:
         raw_area_of_effect, raw_element, raw_stat = raw['leaderskill type'][0].split('_')
         area_of_effect = LeaderSkill.COM2US_AREA_MAP_NEW[raw_area_of_effect]
@@ -61,20 +61,26 @@ def _get_leader_skill(master_id):
         stat = LeaderSkill.COM2US_STAT_NEW_MAP[raw_stat]
         value = int(raw['leaderskill type'][1] * 100)
 
-        skill, _ = LeaderSkill.objects.get_or_create(
+        return context.leader_skill(
             attribute=stat,
             amount=value,
             area=area_of_effect,
             element=element,
         )
-        return skill
     else:
         return None
 
 
-def monsters():
+def monsters(context=None):
+    if context is None:
+        context = ParseContext.load()
+
+    all_raw = {}
+    parsed = {}
+    parsed_skill_sets = {}
+    parsed_awaken_materials = {}
     for master_id, raw in game_data.tables.MONSTERS.items():
-        raw = preprocess_errata(master_id, raw)
+        raw = all_raw[master_id] = preprocess_errata(master_id, raw)
 
         # Parse basic monster information from game data
         # Awakening info
@@ -99,13 +105,13 @@ def monsters():
                 pct = '%' if stat in Stats.PERCENT_STATS else ''
                 awaken_bonus_desc = f'Increases {stat_name} by {amount}{pct}'
             elif awakening_type == AwakenBonusType.NEW_SKILL:
-                new_skill = _get_new_skill(raw, awakens_to_id)
+                new_skill = _get_new_skill(raw, awakens_to_id, context)
                 awaken_bonus_desc = f'Gain new skill: {new_skill.name}'
             elif awakening_type == AwakenBonusType.LEADER_SKILL:
-                awakened_leader_skill = _get_leader_skill(awakens_to_id)
+                awakened_leader_skill = _get_leader_skill(awakens_to_id, context)
                 awaken_bonus_desc = f'Leader Skill: {awakened_leader_skill}'
             elif awakening_type == AwakenBonusType.STRENGTHEN_SKILL:
-                new_skill = _get_new_skill(raw, awakens_to_id)
+                new_skill = _get_new_skill(raw, awakens_to_id, context)
                 awaken_bonus_desc = f'Strengthen Skill: {new_skill.name}'
             elif awakening_type == AwakenBonusType.SECONDARY_AWAKENING:
                 awaken_bonus_desc = 'Secondary Awakening'
@@ -119,17 +125,19 @@ def monsters():
             # Already awakened monsters do not store the description
             awaken_bonus_desc = ''
 
-        skill_set = Skill.objects.filter(com2us_id__in=raw['base skill'])
-        skill_max_sum = skill_set.aggregate(skill_max_sum=Sum('max_level'))['skill_max_sum']
+        skill_set = list({
+            skill_id: context.skills[skill_id] for skill_id in raw['base skill'] if skill_id in context.skills
+        }.values())
+        skill_max_sum = sum(skill.max_level for skill in skill_set)
         if skill_max_sum:
-            skill_ups_to_max = skill_max_sum - skill_set.count()
+            skill_ups_to_max = skill_max_sum - len(skill_set)
         else:
             skill_ups_to_max = None
 
         # TWIN ANGELS OTHER_SKILL - FIX FOR OTHER MONSTERS
         if master_id < 29100 or master_id > 29200:
             for skill in skill_set:
-                if skill.other_skill:
+                if skill.other_skill_id:
                     skill.other_skill = None
                     skill.save()
 
@@ -156,51 +164,42 @@ def monsters():
             'is_awakened': is_awakened,
             'awaken_level': awaken_level,
             'awaken_bonus': awaken_bonus_desc,
-            'awaken_mats_water_low': awaken_materials.get(11001, 0),
-            'awaken_mats_water_mid': awaken_materials.get(12001, 0),
-            'awaken_mats_water_high': awaken_materials.get(13001, 0),
-            'awaken_mats_fire_low': awaken_materials.get(11002, 0),
-            'awaken_mats_fire_mid': awaken_materials.get(12002, 0),
-            'awaken_mats_fire_high': awaken_materials.get(13002, 0),
-            'awaken_mats_wind_low': awaken_materials.get(11003, 0),
-            'awaken_mats_wind_mid': awaken_materials.get(12003, 0),
-            'awaken_mats_wind_high': awaken_materials.get(13003, 0),
-            'awaken_mats_light_low': awaken_materials.get(11004, 0),
-            'awaken_mats_light_mid': awaken_materials.get(12004, 0),
-            'awaken_mats_light_high': awaken_materials.get(13004, 0),
-            'awaken_mats_dark_low': awaken_materials.get(11005, 0),
-            'awaken_mats_dark_mid': awaken_materials.get(12005, 0),
-            'awaken_mats_dark_high': awaken_materials.get(13005, 0),
-            'awaken_mats_magic_low': awaken_materials.get(11006, 0),
-            'awaken_mats_magic_mid': awaken_materials.get(12006, 0),
-            'awaken_mats_magic_high': awaken_materials.get(13006, 0),
-            'leader_skill': _get_leader_skill(master_id),
+            'leader_skill': _get_leader_skill(master_id, context),
             'skill_ups_to_max': skill_ups_to_max,
         }
 
-        monster = update_bestiary_obj(Monster, master_id, defaults)
-
-        # Update related fields
-        monster.skills.set(skill_set)
-
-        # Awaken cost
-        awaken_obj_ids = []
-        for item_id, qty in awaken_materials.items():
-            obj, _ = AwakenCost.objects.update_or_create(
-                monster=monster,
-                item=GameItem.objects.get(
-                    category=GameItem.CATEGORY_ESSENCE,
-                    com2us_id=item_id,
-                ),
-                defaults={
-                    'quantity': qty,
-                }
-            )
-            awaken_obj_ids.append(obj.pk)
-
-        AwakenCost.objects.filter(monster=monster).exclude(pk__in=awaken_obj_ids).delete()
-
-        postprocess_errata(master_id, monster, raw)
+        parsed[master_id] = defaults
+        parsed_skill_sets[master_id] = skill_set
+        parsed_awaken_materials[master_id] = awaken_materials
+
+    # Post-process monster objects with any known issues before they are saved
+    monster_objs = sync_bestiary_objs(
+        Monster,
+        parsed,
+        existing=context.monsters,
+        prepare=lambda monster: postprocess_errata(monster.com2us_id, monster, all_raw[monster.com2us_id]),
+    )
+
+    skill_sets = {}
+    awaken_costs = {}
+    for master_id, monster in monster_objs.items():
+        context.add(monster)
+        skill_sets[monster] = parsed_skill_sets[master_id]
+
+        for item_id, qty in parsed_awaken_materials[master_id].items():
+            item = context.game_item(GameItem.CATEGORY_ESSENCE, item_id)
+            awaken_costs[(monster.pk, item.pk)] = {'quantity': qty}
+
+    # Update related fields
+    sync_many_to_many(Monster.skills, skill_sets)
+    sync_bestiary_objs(
+        AwakenCost,
+        awaken_costs,
+        key_fields=('monster', 'item'),
+        queryset=AwakenCost.objects.filter(monster__in=monster_objs.values()),
+        delete=True,
+        verbose=False,
+    )
 
 
 def definitely_obtainable(obj, raw):
@@ -619,19 +618,22 @@ def postprocess_errata(master_id, monster, raw):
         print(f'Postprocessing erratum for {master_id}.')
         for processing_func in _postprocess_erratum[master_id]:
             monster = processing_func(monster, raw)
-        monster.save()
 
 
-def monster_relationships():
+def monster_relationships(context=None):
+    if context is None:
+        context = ParseContext.load()
+
+    parsed = {}
     for master_id, raw in game_data.tables.MONSTERS.items():
         raw = preprocess_errata(master_id, raw)
-        monster = Monster.objects.get(com2us_id=master_id)
+        monster = context.monster(master_id)
 
         # Awakening
         awakens_to_id = raw['awaken unit id']
 
         if monster.obtainable and awakens_to_id > 0:
-            awakens_to = Monster.objects.get(com2us_id=awakens_to_id)
+            awakens_to = context.monster(awakens_to_id)
         else:
             awakens_to = None
 
@@ -639,42 +641,82 @@ def monster_relationships():
         transforms_to_id = raw['change']
 
         if transforms_to_id > 0:
-            transforms_to = Monster.objects.get(com2us_id=transforms_to_id)
+            transforms_to = context.monster(transforms_to_id)
         else:
             transforms_to = None
 
-        defaults = {
+        parsed.setdefault(master_id, {}).update({
             'awakens_to': awakens_to,
             'transforms_to': transforms_to,
-        }
-
-        update_bestiary_obj(Monster, master_id, defaults)
+        })
 
         # Ensure awakens_to monster has the correct awakens_from. Many entries awaken to
         # same monster, particularly when transformations are involved, so this is explicitly
         # set instead of using a reverse relationship.
         if awakens_to:
-            update_bestiary_obj(Monster, awakens_to.com2us_id, {'awakens_from': monster})
+            parsed.setdefault(awakens_to.com2us_id, {})['awakens_from'] = monster
+
+    for monster in sync_bestiary_objs(Monster, parsed, existing=context.monsters).values():
+        context.add(monster)
+
+    # Awakening chains and slugs follow the relationships through every monster, not only the ones parsed here
+    Monster.objects.all().update_derived_fields()
 
 
-def monster_crafting():
+def monster_crafting(context=None):
+    if context is None:
+        context = ParseContext.load()
+
+    crafted_monsters = []
+    craft_costs = {}
     for master_id, raw in game_data.tables.HOMUNCULUS_CRAFT_COSTS.items():
         for monster_id in raw['unit master id']:
-            monster = Monster.objects.get(com2us_id=monster_id)
+            monster = context.monster(monster_id)
+            crafted_monsters.append(monster)
 
             # Upgrade cost items
-            craft_cost_ids = []
             all_materials = [raw['craft cost']] + raw['craft stuff']
-
             for item_category, item_id, qty in all_materials:
-                obj, _ = MonsterCraftCost.objects.update_or_create(
-                    monster=monster,
-                    item=GameItem.objects.get(category=item_category, com2us_id=item_id),
-                    defaults={
-                        'quantity': qty,
-                    }
-                )
-                craft_cost_ids.append(obj.pk)
-
-            # Delete any no longer used
-            MonsterCraftCost.objects.filter(monster=monster).exclude(pk__in=craft_cost_ids).delete()
+                item = context.game_item(item_category, item_id)
+                craft_costs[(monster.pk, item.pk)] = {'quantity': qty}
+
+    # Also deletes any no longer used
+    sync_bestiary_objs(
+        MonsterCraftCost,
+        craft_costs,
+        key_fields=('monster', 'item'),
+        queryset=MonsterCraftCost.objects.filter(monster__in=crafted_monsters),
+        delete=True,
+        verbose=False,
+    )
+
+
+def monster_stat_tables(verbose=True):
+    # Store stats at every grade and level and the stat chart of monsters whose stats or the stat
+    # calculations changed. Returns the monsters whose tables were updated.
+    monsters = Monster.objects.select_related('stat_table')
+    existing = {}
+    changed = []
+    for monster in monsters:
+        stat_table = Monster.stat_table.related.get_cached_value(monster)
+        if stat_table is not None:
+            existing[monster.pk] = stat_table
+
+        if stat_table is None or stat_table.stats_key != MonsterStatTable.stats_key_for(monster):
+            changed.append(monster)
+
+    curves = stat_curves.monster_stat_curves(changed)
+    parsed = {
+        monster.pk: {
+            'stats_key': MonsterStatTable.stats_key_for(monster),
+            'curves': json.dumps(monster_curves.tolist(), separators=(',', ':')),
+            'chart': json.dumps(stat_curves.stat_chart(monster)),
+        }
+        for monster, monster_curves in zip(changed, curves)
+    }
+
+    sync_bestiary_objs(MonsterStatTable, parsed, key_fields=('monster',), existing=existing, verbose=False)
+    if verbose:
+        print(f'Updated stat tables of {len(changed)} monsters')
+
+    return changed
@@ -0,0 +1,195 @@
+import hashlib
+import os
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from functools import lru_cache
+
+from django.db import connections, transaction
+
+from bestiary.models import ParseCheckpoint
+
+from . import static
+from .dungeons import scenarios, elemental_rifts, rift_raids, secret_dungeons, dimensional_hole
+from .items import craft_materials
+from .monsters import monsters, monster_relationships, monster_crafting, monster_stat_tables
+from .skills import skills, homonculus_skills, simplify_multipliers
+
+
+class Stage:
+    """A step of the game data import.
+
+    Stages only start once all of their `dependencies` that are part of the same run have finished.
+    Stages using the database receive the shared ParseContext when `uses_context` is set and run in
+    a thread with their own connection, inside a single transaction. Stages with `in_process` set do not touch the database and
+    run in a separate process. `setup` runs in the main thread before any stage starts, for work that
+    forks processes and is not safe to do once other threads are running.
+    """
+
+    def __init__(self, name, func, description, dependencies=(), uses_context=True, in_process=False, setup=None):
+        self.name = name
+        self.func = func
+        self.description = description
+        self.dependencies = tuple(dependencies)
+        self.uses_context = uses_context and not in_process
+        self.in_process = in_process
+        self.setup = setup
+
+    def __repr__(self):
+        return f'<Stage {self.name}>'
+
+
+STAGES = OrderedDict((stage.name, stage) for stage in [
+    Stage('decrypt_images', static.decrypt_images, 'Decrypting static files', in_process=True),
+    Stage('crop_images', static.crop_images, 'Cropping static files', ['decrypt_images'], in_process=True),
+    Stage('craft_materials', craft_materials, 'Parsing craft materials'),
+    Stage('skills', skills, 'Parsing skill data', setup=simplify_multipliers),
+    Stage('monsters', monsters, 'Parsing monster data', ['skills', 'craft_materials']),
+    Stage('homonculus_skills', homonculus_skills, 'Parsing homunculus skill data', ['skills', 'monsters', 'craft_materials']),
+    Stage('monster_relationships', monster_relationships, 'Setting monster awaken/transformation relationships', ['monsters']),
+    Stage('monster_crafting', monster_crafting, 'Parsing monster crafting data', ['monsters', 'craft_materials']),
+    Stage('monster_stat_tables', monster_stat_tables, 'Calculating monster stat tables', ['monsters'], uses_context=False),
+    Stage('scenarios', scenarios, 'Parsing scenario data', uses_context=False),
+    Stage('rift_raids', rift_raids, 'Parsing rift raid data', uses_context=False),
+    Stage('elemental_rifts', elemental_rifts, 'Parsing elemental rift beast data', uses_context=False),
+    Stage('secret_dungeons', secret_dungeons, 'Parsing secret dungeon data', ['monsters']),
+    Stage('dimensional_hole', dimensional_hole, 'Parsing dimensional hole data', ['monsters']),
+    Stage(
+        'build_sprites',
+        static.build_sprites,
+        'Building icon sprite atlases',
+        ['crop_images', 'craft_materials', 'skills', 'monsters'],
+    ),
+])
+
+
+def select_stages(only=None, skip=None, stages=STAGES):
+    """Stages to run, in declaration order. Raises ValueError for unknown stage names."""
+    unknown = [name for name in (only or []) + (skip or []) if name not in stages]
+    if unknown:
+        raise ValueError(f'Unknown stage(s): {", ".join(unknown)}. Choices are: {", ".join(stages)}')
+
+    return [
+        stage for name, stage in stages.items()
+        if (not only or name in only) and name not in (skip or [])
+    ]
+
+
+@lru_cache(maxsize=None)
+def parser_hash():
+    """Hash of the source of the parse package, so checkpoints are not reused once the parser changes."""
+    digest = hashlib.sha256()
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+
+    for filename in sorted(os.listdir(package_dir)):
+        if filename.endswith('.py'):
+            with open(os.path.join(package_dir, filename), 'rb') as f:
+                digest.update(filename.encode())
+                digest.update(f.read())
+
+    return digest.hexdigest()
+
+
+def completed_stages(version):
+    """Names of stages with a checkpoint for this game data version and the current parser code."""
+    return set(
+        ParseCheckpoint.objects.filter(version=version, parser_hash=parser_hash()).values_list('stage', flat=True)
+    )
+
+
+def run_stages(stages, context=None, max_workers=4, log=print, version=None):
+    """Run stages concurrently as soon as their dependencies have finished.
+
+    Returns a dict of stage name -> run time in seconds, in order of completion. The first failing
+    stage stops any further stages from starting and its exception is raised once running stages
+    have finished. When `version` is given, every completed stage records a ParseCheckpoint. For
+    database stages the checkpoint is committed together with the stage's changes.
+    """
+    names = {stage.name for stage in stages}
+    pending = list(stages)
+    running = {}
+    finished = set()
+    timings = OrderedDict()
+
+    if connections['default'].vendor == 'sqlite':
+        # SQLite only allows one writing transaction at a time
+        max_workers = 1
+
+    for stage in stages:
+        if stage.setup:
+            stage.setup()
+
+    # Forked processes would repeat anything still buffered
+    sys.stdout.flush()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as threads, ProcessPoolExecutor(max_workers=1) as processes:
+        if any(stage.in_process for stage in stages):
+            # Workers are forked on first use. Forking while a stage thread holds a database
+            # connection or a lock would copy it into the worker in that state, so the worker is
+            # started here, before any thread stage is submitted.
+            processes.submit(_start_worker).result()
+
+        while pending or running:
+            for stage in list(pending):
+                if all(dependency in finished or dependency not in names for dependency in stage.dependencies):
+                    pending.remove(stage)
+                    log(f'{stage.description}...')
+                    if stage.in_process:
+                        future = processes.submit(_run_in_process, stage.name)
+                    else:
+                        future = threads.submit(_run_in_thread, stage, context, version)
+                    running[future] = stage
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                if future.exception():
+                    # Let running stages finish, but don't start any more
+                    pending.clear()
+                    wait(running)
+                    raise future.exception()
+
+                timings[stage.name] = future.result()
+                finished.add(stage.name)
+
+                if stage.in_process and version is not None:
+                    _record_checkpoint(version, stage.name, timings[stage.name])
+
+    return timings
+
+
+def _run_in_thread(stage, context, version):
+    start = time.perf_counter()
+    try:
+        with transaction.atomic():
+            if stage.uses_context:
+                stage.func(context)
+            else:
+                stage.func()
+
+            if version is not None:
+                _record_checkpoint(version, stage.name, time.perf_counter() - start)
+    finally:
+        # Each thread has its own database connection
+        connections.close_all()
+
+    return time.perf_counter() - start
+
+
+def _start_worker():
+    pass
+
+
+def _run_in_process(stage_name):
+    start = time.perf_counter()
+    STAGES[stage_name].func()
+    return time.perf_counter() - start
+
+
+def _record_checkpoint(version, stage_name, duration):
+    ParseCheckpoint.objects.update_or_create(
+        version=version,
+        stage=stage_name,
+        defaults={'parser_hash': parser_hash(), 'duration': duration},
+    )
@@ -1,25 +1,29 @@
 import json
+import os
 import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from numbers import Number
 
-from sympy import simplify
-
-from bestiary.models import Monster, Skill, SkillUpgrade, ScalingStat, HomunculusSkill, HomunculusSkillCraftCost, \
-    GameItem
+from bestiary import formulas
+from bestiary.models import Skill, SkillUpgrade, HomunculusSkill, HomunculusSkillCraftCost
 from bestiary.parse import game_data
-from .util import update_bestiary_obj
+from .context import ParseContext
+from .util import sync_bestiary_objs, sync_many_to_many
 
 
 def _get_skill_slot(master_id):
     # Search for skill usage on a monster and determine what index the skill occupies in the monster's skillset
     if master_id in game_data.tables.HOMUNCULUS_SKILL_TREES.keys():
-        for skill_data in game_data.tables.HOMUNCULUS_SKILL_TREES.values():
-            if master_id == skill_data['master id']:
-                return skill_data['slot']
+        skill_tree_ids = game_data.tables.HOMUNCULUS_SKILL_TREES.index('master id').get(master_id)
+        if skill_tree_ids:
+            return game_data.tables.HOMUNCULUS_SKILL_TREES[skill_tree_ids[0]]['slot']
     else:
-        for monster_data in game_data.tables.MONSTERS.values():
-            if master_id in monster_data['base skill']:
-                return monster_data['base skill'].index(master_id) + 1
+        usages = game_data.tables.MONSTERS.inverted_index('base skill').get(master_id)
+        if usages:
+            # First monster with the skill in table order
+            monster_id, position = usages[0]
+            return position + 1
 
     # Not found
     return -1
@@ -76,11 +80,81 @@ def _force_eval_ltr(expr):
             return ltr_expr, fixed
 
 
+_simplified_formulas = None
+_simplified_formulas_path = os.path.join(game_data._DecodeCache.directory, 'simplified_formulas.pkl')
+
+
+def _sympy_version():
+    import sympy
+
+    return sympy.__version__
+
+
+def _get_simplified_formulas():
+    # Persistent memo of LTR formula -> simplified formula, shared across parse runs. Stored per sympy
+    # version because upgrading sympy can change the simplified output.
+    global _simplified_formulas
+
+    if _simplified_formulas is None:
+        memo = game_data._DecodeCache.load_object(_simplified_formulas_path) or {}
+        _simplified_formulas = memo.get(_sympy_version(), {})
+
+    return _simplified_formulas
+
+
+def _simplify_formula(formula):
+    # sympy is slow to import, so only load it once skills are actually being parsed
+    from sympy import simplify
+
+    return str(simplify(formula))
+
+
+def _simplify_multipliers(raw_multipliers):
+    # Simplify all formulas missing from the memo up front, spread over a process pool
+    simplified_formulas = _get_simplified_formulas()
+    missing = set()
+
+    for raw_multiplier in raw_multipliers:
+        formula, _ = _force_eval_ltr(raw_multiplier)
+        if formula and formula not in simplified_formulas:
+            missing.add(formula)
+
+    if not missing:
+        return
+
+    missing = sorted(missing)
+    print(f'Simplifying {len(missing)} new multiplier formulas')
+
+    # Load sympy before the workers are forked so each one does not import it again
+    import sympy  # noqa: F401
+
+    sys.stdout.flush()
+    with ProcessPoolExecutor() as executor:
+        simplified_formulas.update(zip(missing, executor.map(_simplify_formula, missing, chunksize=16)))
+
+    game_data._DecodeCache.store_object(_simplified_formulas_path, {_sympy_version(): simplified_formulas})
+
+
+def simplify_multipliers():
+    # Forks a process pool, so this must run before the parse starts any other threads
+    _simplify_multipliers(
+        preprocess_errata(master_id, raw, verbose=False)['fun data'] for master_id, raw in game_data.tables.SKILLS.items()
+    )
+
+
+def _get_simplified_formula(formula):
+    simplified_formulas = _get_simplified_formulas()
+    if formula not in simplified_formulas:
+        simplified_formulas[formula] = _simplify_formula(formula)
+
+    return simplified_formulas[formula]
+
+
 def _simplify_multiplier(raw_multiplier):
     # Simplify the expression and change format to follow usual order of operations
     formula, fixed = _force_eval_ltr(raw_multiplier)
     if formula:
-        formula = str(simplify(formula))
+        formula = _get_simplified_formula(formula)
 
     if fixed:
         formula += ' (Fixed)'
@@ -88,23 +162,64 @@ def _simplify_multiplier(raw_multiplier):
     return formula
 
 
-def _extract_scaling_stats(mult_formula):
-    # Extract/refine the scaling stats used in the formula
-    scaling_stats = []
-    for stat in ScalingStat.objects.all():
-        if re.search(f'{stat.com2us_desc}\\b', mult_formula):
-            mult_formula = mult_formula.replace(stat.com2us_desc, f'{{{stat.stat}}}')
-            scaling_stats.append(stat)
+def _multiplier_ast(master_id, raw_multiplier):
+    # Structured version of the simplified formula which can be compiled with `formulas.compile_expr`
+    formula, fixed = _force_eval_ltr(raw_multiplier)
+    if not formula:
+        return None
+
+    try:
+        expr = formulas.parse(_get_simplified_formula(formula))
+    except ValueError as e:
+        print(f'!!! Unable to store multiplier expression for skill {master_id}: {e}')
+        return None
+
+    return json.dumps({'expr': expr, 'fixed': fixed})
+
+
+class _ScalingStatMatcher:
+    # Finds every scaling stat in a formula with a single regex built from the ScalingStat table
+    def __init__(self, scaling_stats):
+        self.stats = {}
+        for stat in scaling_stats:
+            if stat.com2us_desc:
+                self.stats.setdefault(stat.com2us_desc, stat)
+
+        # Longest first so that overlapping names prefer the most specific stat
+        descriptions = sorted(self.stats, key=len, reverse=True)
+        if descriptions:
+            self.pattern = re.compile(r'\b({})\b'.format('|'.join(map(re.escape, descriptions))))
+        else:
+            self.pattern = None
 
-    return scaling_stats, mult_formula
+    def extract(self, mult_formula):
+        # Extract/refine the scaling stats used in the formula
+        scaling_stats = []
 
+        def replace(match):
+            stat = self.stats[match.group(1)]
+            if stat not in scaling_stats:
+                scaling_stats.append(stat)
+            return f'{{{stat.stat}}}'
 
-def skills():
-    other_skills = {}
-    for master_id, raw in game_data.tables.SKILLS.items():
-        # Fix up raw data prior to parsing
-        raw = preprocess_errata(master_id, raw)
+        if self.pattern and mult_formula:
+            mult_formula = self.pattern.sub(replace, mult_formula)
+
+        return scaling_stats, mult_formula
+
+
+def skills(context=None):
+    if context is None:
+        context = ParseContext.load()
+
+    # Fix up raw data prior to parsing
+    all_raw = [(master_id, preprocess_errata(master_id, raw)) for master_id, raw in game_data.tables.SKILLS.items()]
+    _simplify_multipliers(raw['fun data'] for _, raw in all_raw)
 
+    scaling_stat_matcher = _ScalingStatMatcher(context.scaling_stats.values())
+    parsed = {}
+    parsed_scaling_stats = {}
+    for master_id, raw in all_raw:
         # Parse basic skill information from game data
         level_up_bonuses = []
         for upgrade_id, amount in raw['level']:
@@ -113,7 +228,7 @@ def skills():
         level_up_text = '\n'.join(level_up_bonuses)
 
         multiplier_formula = _simplify_multiplier(raw['fun data'])
-        scaling_stats, multiplier_formula = _extract_scaling_stats(multiplier_formula)
+        scaling_stats, multiplier_formula = scaling_stat_matcher.extract(multiplier_formula)
 
         defaults = {
             'name': game_data.strings.SKILL_NAMES.get(master_id, f'skill_{master_id}').strip(),
@@ -125,35 +240,47 @@ def skills():
             'max_level': raw['max level'],
             'multiplier_formula_raw': json.dumps(raw['fun data']),
             'multiplier_formula': multiplier_formula,
+            'multiplier_formula_ast': _multiplier_ast(master_id, raw['fun data']),
             'level_progress_description': level_up_text,
         }
 
-        skill = update_bestiary_obj(Skill, master_id, defaults)
+        parsed[master_id] = defaults
+        # Post-process scaling stats with any known issues before they are synced
+        parsed_scaling_stats[master_id] = postprocess_errata(master_id, scaling_stats, context)
+
+    skill_objs = sync_bestiary_objs(Skill, parsed, existing=context.skills)
+
+    other_skills = {}
+    skill_upgrades = {}
+    for master_id, raw in all_raw:
+        skill = context.add(skill_objs[master_id])
 
         if raw['other skill']:
             other_skills[skill] = raw['other skill']
 
-        # Update skill level up progress
-        SkillUpgrade.objects.filter(skill=skill, level__gt=skill.max_level).delete()
+        # Skill level up progress
         for idx, (upgr_type, amount) in enumerate(raw['level']):
-            SkillUpgrade.objects.update_or_create(
-                skill=skill,
-                level=idx + 2,  # upgrades start applying at skill lv.2
-                defaults={
-                    'effect': SkillUpgrade.COM2US_UPGRADE_MAP[upgr_type],
-                    'amount': amount,
-                }
-            )
-
-        # Update scaling stats
-        skill.scaling_stats.set(scaling_stats)
-
-        # Post-process skill object with any known issues
-        postprocess_errata(master_id, skill, raw)
+            skill_upgrades[(skill.pk, idx + 2)] = {  # upgrades start applying at skill lv.2
+                'effect': SkillUpgrade.COM2US_UPGRADE_MAP[upgr_type],
+                'amount': amount,
+            }
+
+    sync_bestiary_objs(
+        SkillUpgrade,
+        skill_upgrades,
+        key_fields=('skill', 'level'),
+        queryset=SkillUpgrade.objects.filter(skill__in=skill_objs.values()),
+        delete=True,
+        verbose=False,
+    )
+    sync_many_to_many(
+        Skill.scaling_stats,
+        {skill_objs[master_id]: scaling_stats for master_id, scaling_stats in parsed_scaling_stats.items()},
+    )
 
     for skill, other_skill_master_id in other_skills.items():
         try:
-            other_skill = Skill.objects.get(com2us_id=other_skill_master_id)
+            other_skill = context.skill(other_skill_master_id)
         except Skill.DoesNotExist:
             print(f'!!! Missing other skill {other_skill_master_id} for skill {skill.com2us_id}')
             continue
@@ -195,19 +322,22 @@ def fix_holy_light_multiplier(raw):
     return raw
 
 
-def add_scales_with_def(obj, raw):
-    obj.scaling_stats.add(ScalingStat.objects.get(com2us_desc='DEF'))
-    return obj
+def _add_scaling_stat(scaling_stats, stat):
+    if stat not in scaling_stats:
+        scaling_stats.append(stat)
+    return scaling_stats
 
 
-def add_scales_with_max_hp(obj, raw):
-    obj.scaling_stats.add(ScalingStat.objects.get(com2us_desc='ATTACK_TOT_HP'))
-    return obj
+def add_scales_with_def(scaling_stats, context):
+    return _add_scaling_stat(scaling_stats, context.scaling_stat('DEF'))
 
 
-def add_scales_with_target_hp(obj, raw):
-    obj.scaling_stats.add(ScalingStat.objects.get(com2us_desc='TARGET_TOT_HP'))
-    return obj
+def add_scales_with_max_hp(scaling_stats, context):
+    return _add_scaling_stat(scaling_stats, context.scaling_stat('ATTACK_TOT_HP'))
+
+
+def add_scales_with_target_hp(scaling_stats, context):
+    return _add_scaling_stat(scaling_stats, context.scaling_stat('TARGET_TOT_HP'))
 
 
 def remove_multiplier(raw):
@@ -266,41 +396,57 @@ _postprocess_erratum = {
 }
 
 
-def preprocess_errata(master_id, raw):
+def preprocess_errata(master_id, raw, verbose=True):
     if master_id in _preprocess_erratum:
-        print(f'Preprocessing raw data for {master_id}.')
+        if verbose:
+            print(f'Preprocessing raw data for {master_id}.')
         for processing_func in _preprocess_erratum[master_id]:
             raw = processing_func(raw)
     return raw
 
 
-def postprocess_errata(master_id, skill, raw):
+def postprocess_errata(master_id, scaling_stats, context):
     if master_id in _postprocess_erratum:
         print(f'Postprocessing erratum for {master_id}.')
         for processing_func in _postprocess_erratum[master_id]:
-            skill = processing_func(skill, raw)
-        skill.save()
+            scaling_stats = processing_func(scaling_stats, context)
+    return scaling_stats
+
+
+def homonculus_skills(context=None):
+    if context is None:
+        context = ParseContext.load()
 
+    skill_trees = game_data.tables.HOMUNCULUS_SKILL_TREES
+    homu_skills = sync_bestiary_objs(
+        HomunculusSkill,
+        {context.skill(master_id).pk: {} for master_id in skill_trees},
+        key_fields=('skill', ),
+    )
 
-def homonculus_skills():
-    for master_id, raw in game_data.tables.HOMUNCULUS_SKILL_TREES.items():
-        base_skill = Skill.objects.get(com2us_id=master_id)
-        homu_skill, created = HomunculusSkill.objects.update_or_create(skill=base_skill)
-        homu_skill.monsters.set(Monster.objects.filter(com2us_id__in=raw['unit master id']))
-        homu_skill.prerequisites.set(Skill.objects.filter(com2us_id__in=raw['prerequisite']))
+    monsters = {}
+    prerequisites = {}
+    craft_costs = {}
+    for master_id, raw in skill_trees.items():
+        homu_skill = homu_skills[context.skill(master_id).pk]
+        monsters[homu_skill] = [context.monsters[i] for i in raw['unit master id'] if i in context.monsters]
+        prerequisites[homu_skill] = [context.skills[i] for i in raw['prerequisite'] if i in context.skills]
 
         # Upgrade cost items
-        craft_cost_ids = []
         all_materials = [raw['upgrade cost']] + raw['upgrade stuff']
         for item_category, item_id, qty in all_materials:
-            obj, _ = HomunculusSkillCraftCost.objects.update_or_create(
-                skill=homu_skill,
-                item=GameItem.objects.get(category=item_category, com2us_id=item_id),
-                defaults={
-                    'quantity': qty,
-                }
-            )
-            craft_cost_ids.append(obj.pk)
-
-        # Delete any no longer used
-        HomunculusSkillCraftCost.objects.filter(skill=homu_skill).exclude(pk__in=craft_cost_ids).delete()
+            item = context.game_item(item_category, item_id)
+            craft_costs[(homu_skill.pk, item.pk)] = {'quantity': qty}
+
+    sync_many_to_many(HomunculusSkill.monsters, monsters)
+    sync_many_to_many(HomunculusSkill.prerequisites, prerequisites)
+
+    # Also deletes any no longer used
+    sync_bestiary_objs(
+        HomunculusSkillCraftCost,
+        craft_costs,
+        key_fields=('skill', 'item'),
+        queryset=HomunculusSkillCraftCost.objects.filter(skill__in=homu_skills.values()),
+        delete=True,
+        verbose=False,
+    )
@@ -1,23 +1,44 @@
+import hashlib
 import io
+import json
+import math
+import os
+import re
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from glob import iglob
 
 from PIL import Image
-from bitstring import Bits, BitStream, ReadError
 
-from .game_data import JokerContainerFile
+from bestiary import sprites
+
+from .game_data import JokerContainerFile, _DecodeCache
 
 
 # Functions to work with static files
-def crop_images():
+def crop_images(**kwargs):
+    path = kwargs.pop('path', 'herders/static/herders/images/monsters')
+    return _process_images('crop_images', iglob(f'{path}/*.png'), _crop_image)
+
+
+def _crop_image(im_path, known_digest):
+    with open(im_path, 'rb') as f:
+        bts = f.read()
+
+    digest = hashlib.sha256(bts).hexdigest()
+    if digest == known_digest:
+        return digest, None
+
     # If the image is 102x102, we need to crop out the 1px white border.
-    for im_path in iglob('herders/static/herders/images/monsters/*.png'):
-        im = Image.open(im_path)
+    im = Image.open(io.BytesIO(bts))
+    if im.size == (102, 102):
+        print(f'Cropping {im_path}')
+        crop = im.crop((1, 1, 101, 101))
+        crop.save(im_path)
+        return _file_digest(im_path), 'cropped'
 
-        if im.size == (102, 102):
-            print(f'Cropping {im_path}')
-            crop = im.crop((1, 1, 101, 101))
-            im.close()
-            crop.save(im_path)
+    return digest, None
 
 
 com2us_decrypt_values = [
@@ -40,60 +61,226 @@ com2us_decrypt_values = [
 ]
 
 
+# Byte substitution table as accepted by bytes.translate()
+_DECRYPT_TABLE = bytes(com2us_decrypt_values)
+
+# Encrypted PNGs have 0x0B as the 8th byte instead of the correct signature 0x0A
+_PNG_SIGNATURE_POS = 7
+
+
+class _ImageManifest:
+    """Content hashes of static images already processed by a parse step, kept in the decode cache.
+
+    Files with the same size and modification time as recorded are skipped without being read.
+    Files that were only touched, for example by a git checkout, are recognised by their hash.
+    """
+
+    def __init__(self, name):
+        self.path = os.path.join(_DecodeCache.directory, f'{name}_manifest.pkl')
+        self.entries = _DecodeCache.load_object(self.path) or {}
+
+    def changed(self, paths):
+        # (path, last known content hash) of each file that may have changed
+        for im_path in paths:
+            stat = os.stat(im_path)
+            entry = self.entries.get(im_path)
+            if entry is None or entry[:2] != (stat.st_size, stat.st_mtime_ns):
+                yield im_path, entry[2] if entry else None
+
+    def update(self, im_path, digest):
+        stat = os.stat(im_path)
+        self.entries[im_path] = (stat.st_size, stat.st_mtime_ns, digest)
+
+    def save(self):
+        _DecodeCache.store_object(self.path, self.entries)
+
+
+def _process_images(name, im_paths, worker):
+    """Run `worker(im_path, known_digest)` in a process pool for each image changed since the last run.
+
+    Workers return the content hash of the file after processing and a short description of what
+    was done to it, or None if it needed no changes. Returns and prints a summary of work done.
+    """
+    im_paths = list(im_paths)
+    manifest = _ImageManifest(name)
+    changed = list(manifest.changed(im_paths))
+    summary = Counter(skipped=len(im_paths) - len(changed))
+
+    if changed:
+        changed_paths, known_digests = zip(*changed)
+
+        # Forked workers would repeat anything still buffered
+        sys.stdout.flush()
+        with ProcessPoolExecutor() as executor:
+            results = executor.map(worker, changed_paths, known_digests, chunksize=32)
+            for im_path, (digest, action) in zip(changed_paths, results):
+                manifest.update(im_path, digest)
+                summary[action or 'unchanged'] += 1
+
+        manifest.save()
+
+    print(f'{name}: ' + ', '.join(f'{count} {action}' for action, count in sorted(summary.items())))
+    return summary
+
+
+def _file_digest(im_path):
+    with open(im_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
 def decrypt_images(**kwargs):
     path = kwargs.pop('path', 'herders/static/herders/images')
-    for im_path in iglob(f'{path}/**/*.png', recursive=True):
-        encrypted = BitStream(filename=im_path)
-
-        # Check if it is 'encrypted'. 8th byte is 0x0B instead of the correct signature 0x0A
-        encrypted.pos = 0x07 * 8
-        signature = encrypted.peek('uint:8')
-        if signature == 0x0B:
-            print(f'Decrypting {im_path}')
-            # Correct the PNG signature
-            encrypted.overwrite('0x0A', encrypted.pos)
-
-            # Replace bits with magic decrypted values
-            try:
-                while True:
-                    pos = encrypted.pos
-                    val = encrypted.peek('uint:8')
-                    encrypted.overwrite(Bits(uint=com2us_decrypt_values[val], length=8), pos)
-            except ReadError:
-                # EOF
-                pass
-
-            # Write it back to the file
-            with open(im_path, 'wb') as f:
-                encrypted.tofile(f)
-
-            continue
-
-        # Check for weird jpeg format with extra header junk. Convert to png.
-        encrypted.pos = 0
-        if encrypted.peek('bytes:5') == b'Joker':
-            print(f'Converting Joker container JPEG to PNG {im_path}')
-            with open(im_path, 'rb') as f:
-                bts = f.read()
-                first_img = bts.find(b'JFIF')
-                second_img = bts.rfind(b'JFIF')
-                imgs = []
-                if second_img > -1 and first_img != second_img:
-                    imgs = [bts[:second_img], bts[second_img:]]
-                    # Add Joker & header to immitate new file
-                    imgs[1] = imgs[0][imgs[0].find(b'Joker'):first_img] + imgs[1]
-                    imgs = [JokerContainerFile(img, read=False) for img in imgs]
-                else:
-                    img = JokerContainerFile(bts, read=False)
-
-            # Open it as a jpg and resave to disk
-            try:
-                if len(imgs) > 1:
-                    new_imfile = Image.open(io.BytesIO(imgs[0].data.tobytes()))
-                    new_mask = Image.open(io.BytesIO(imgs[1].data.tobytes())).convert('L')
-                    new_imfile.putalpha(new_mask)
-                else:
-                    new_imfile = Image.open(io.BytesIO(img.data.tobytes()))
-                new_imfile.save(im_path)
-            except IOError:
-                print(f'Unable to open {im_path}')
+    return _process_images('decrypt_images', iglob(f'{path}/**/*.png', recursive=True), _decrypt_image)
+
+
+def _decrypt_image(im_path, known_digest):
+    with open(im_path, 'rb') as f:
+        bts = f.read()
+
+    digest = hashlib.sha256(bts).hexdigest()
+    if digest == known_digest:
+        return digest, None
+
+    if len(bts) > _PNG_SIGNATURE_POS and bts[_PNG_SIGNATURE_POS] == 0x0B:
+        print(f'Decrypting {im_path}')
+        # Correct the PNG signature and replace the remaining bytes with magic decrypted values
+        bts = bts[:_PNG_SIGNATURE_POS] + b'\x0A' + bts[_PNG_SIGNATURE_POS + 1:].translate(_DECRYPT_TABLE)
+
+        # Write it back to the file
+        with open(im_path, 'wb') as f:
+            f.write(bts)
+
+        return hashlib.sha256(bts).hexdigest(), 'decrypted'
+
+    # Check for weird jpeg format with extra header junk. Convert to png.
+    if bts[:5] == b'Joker':
+        print(f'Converting Joker container JPEG to PNG {im_path}')
+        if _convert_joker_image(im_path, bts):
+            return _file_digest(im_path), 'converted'
+        else:
+            return digest, 'failed to convert'
+
+    return digest, None
+
+
+def _convert_joker_image(im_path, bts):
+    first_img = bts.find(b'JFIF')
+    second_img = bts.rfind(b'JFIF')
+    imgs = []
+    if second_img > -1 and first_img != second_img:
+        imgs = [bts[:second_img], bts[second_img:]]
+        # Add Joker & header to immitate new file
+        imgs[1] = imgs[0][imgs[0].find(b'Joker'):first_img] + imgs[1]
+        imgs = [JokerContainerFile(img, read=False) for img in imgs]
+    else:
+        img = JokerContainerFile(bts, read=False)
+
+    # Open it as a jpg and resave to disk
+    try:
+        if len(imgs) > 1:
+            new_imfile = Image.open(io.BytesIO(imgs[0].data.tobytes()))
+            new_mask = Image.open(io.BytesIO(imgs[1].data.tobytes())).convert('L')
+            new_imfile.putalpha(new_mask)
+        else:
+            new_imfile = Image.open(io.BytesIO(img.data.tobytes()))
+        new_imfile.save(im_path)
+    except IOError:
+        print(f'Unable to open {im_path}')
+        return False
+
+    return True
+
+
+# Size in pixels that icons in each directory are displayed at
+SPRITE_CELL_SIZES = {
+    'monsters': 50,
+    'skills': 50,
+    'skills/leader': 50,
+    'elements': 30,
+    'items': 50,
+}
+
+
+def build_sprites(context, **kwargs):
+    """Pack icons into WebP sprite atlases, scaled to the size they are displayed at.
+
+    Monster icons are grouped by element and skill icons by the com2us icon sheet they come from, so
+    a page of monsters only needs a handful of images. Writes the atlas position of every icon to
+    the sprite map read by `bestiary.sprites`. Atlases whose source images are unchanged since the
+    last run are not rebuilt.
+    """
+    path = kwargs.pop('path', 'herders/static/herders/images')
+    out_path = os.path.join(path, os.path.relpath(sprites.SPRITE_DIRECTORY, 'herders/images'))
+    os.makedirs(out_path, exist_ok=True)
+
+    manifest_path = os.path.join(_DecodeCache.directory, 'build_sprites_manifest.pkl')
+    manifest = _DecodeCache.load_object(manifest_path) or {}
+    summary = Counter()
+    sprite_map = {'atlases': {}, 'sprites': {}}
+
+    for atlas, (cell_size, images) in sorted(_sprite_groups(context, path).items()):
+        images.sort()
+        cols = math.ceil(math.sqrt(len(images)))
+        rows = math.ceil(len(images) / cols)
+        filename = f'{atlas}.webp'
+        atlas_path = os.path.join(out_path, filename)
+
+        signature = [cell_size]
+        for image in images:
+            stat = os.stat(os.path.join(path, image))
+            signature.append((image, stat.st_size, stat.st_mtime_ns))
+
+        if manifest.get(atlas) == signature and os.path.exists(atlas_path):
+            summary['unchanged'] += 1
+        else:
+            sheet = Image.new('RGBA', (cols * cell_size, rows * cell_size))
+            for index, image in enumerate(images):
+                with Image.open(os.path.join(path, image)) as im:
+                    # Icons are stretched to a square like an <img> with fixed width and height would be
+                    thumb = im.convert('RGBA').resize((cell_size, cell_size), Image.LANCZOS)
+                sheet.paste(thumb, ((index % cols) * cell_size, (index // cols) * cell_size))
+
+            sheet.save(atlas_path, 'WEBP', quality=80)
+            manifest[atlas] = signature
+            summary['built'] += 1
+
+        sprite_map['atlases'][atlas] = {'file': filename, 'cols': cols, 'rows': rows, 'cell_size': cell_size}
+        for index, image in enumerate(images):
+            sprite_map['sprites'][image] = {'atlas': atlas, 'col': index % cols, 'row': index // cols}
+
+    # Remove atlases of groups that no longer exist
+    for filename in os.listdir(out_path):
+        name, extension = os.path.splitext(filename)
+        if extension == '.webp' and name not in sprite_map['atlases']:
+            os.remove(os.path.join(out_path, filename))
+            manifest.pop(name, None)
+            summary['removed'] += 1
+
+    with open(os.path.join(out_path, sprites.SPRITE_MAP), 'w') as f:
+        json.dump(sprite_map, f, sort_keys=True, separators=(',', ':'))
+
+    _DecodeCache.store_object(manifest_path, manifest)
+    sprites.clear_sprite_map()
+    print('build_sprites: ' + ', '.join(f'{count} {action}' for action, count in sorted(summary.items())))
+    return summary
+
+
+def _sprite_groups(context, path):
+    # Atlas name -> (cell size, [image paths relative to `path`])
+    monster_elements = {monster.image_filename: monster.element for monster in context.monsters.values()}
+    groups = {}
+
+    for directory, cell_size in SPRITE_CELL_SIZES.items():
+        for im_path in iglob(os.path.join(path, directory, '*.png')):
+            filename = os.path.basename(im_path)
+            if directory == 'monsters':
+                atlas = f'monsters-{monster_elements.get(filename, "other")}'
+            elif directory == 'skills':
+                sheet = re.match(r'skill_icon_(\d+)_', filename)
+                atlas = f'skills-{sheet.group(1)}' if sheet else 'skills-other'
+            else:
+                atlas = directory.replace('/', '-')
+
+            groups.setdefault(atlas, (cell_size, []))[1].append(f'{directory}/{filename}')
+
+    return groups
@@ -1,32 +1,144 @@
 import difflib
 
+BULK_BATCH_SIZE = 500
 
-def update_bestiary_obj(model, com2us_id, defaults):
-    obj, created = model.objects.get_or_create(com2us_id=com2us_id, defaults=defaults)
-
-    if created:
-        print(f'!!! Created new {model.__name__} {com2us_id}')
-    else:
-        # Compare parsed values to existing object
-        updated = False
-
-        for field, parse_value in defaults.items():
-            current_value = getattr(obj, field)
-            if current_value != parse_value:
-                if isinstance(current_value, str):
-                    # Display a diff
-                    print(f'Updating {field} for {com2us_id}')
-                    for line in difflib.ndiff([current_value], [parse_value]):
-                        print(line)
-                else:
-                    print(f'Updating {field} for {com2us_id} from `{current_value}` to `{parse_value}`.')
+
+def sync_bestiary_objs(model, parsed, key_fields=('com2us_id',), existing=None, queryset=None, delete=False, prepare=None, verbose=True):
+    """Insert, update and optionally delete all parsed rows of a model in bulk.
+
+    `parsed` maps the key of each row to a dict of field values. Keys are the value of `key_fields`,
+    or a tuple of values when there is more than one key field. Foreign keys in `key_fields` are
+    matched on their ID. Existing rows are taken from `existing` (a dict of key -> object, such as
+    the maps kept by ParseContext) or loaded from `queryset` in a single query. `prepare(obj)` is
+    called on every parsed object after the field values are applied and before it is written.
+    With `delete`, existing rows that are not in `parsed` are removed. `verbose=False` skips printing
+    each created and updated row, which is useful for through tables.
+
+    Returns a dict of key -> object for every parsed row.
+    """
+    attnames = [model._meta.get_field(field).attname for field in key_fields]
+    concrete_fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+
+    def get_key(obj):
+        key = tuple(getattr(obj, attname) for attname in attnames)
+        return key if len(key) > 1 else key[0]
+
+    def display_key(key):
+        if len(key_fields) > 1:
+            return ', '.join(f'{field}={value}' for field, value in zip(key_fields, key))
+        return key
+
+    if queryset is None:
+        queryset = model.objects.all()
+
+    if existing is None:
+        existing = {}
+        for obj in queryset:
+            existing.setdefault(get_key(obj), obj)
+
+    objs = {}
+    to_create = []
+    to_update = []
+    update_fields = set()
+
+    for key, defaults in parsed.items():
+        obj = existing.get(key)
+        created = obj is None
+
+        if created:
+            key_values = key if len(key_fields) > 1 else (key, )
+            obj = model(**dict(zip(attnames, key_values)), **defaults)
+            if verbose:
+                print(f'!!! Created new {model.__name__} {display_key(key)}')
+            to_create.append(obj)
+        else:
+            previous = {field.attname: getattr(obj, field.attname) for field in concrete_fields}
+
+            # Compare parsed values to existing object
+            for field, parse_value in defaults.items():
+                attname = model._meta.get_field(field).attname
+                parse_id = parse_value.pk if attname != field and parse_value is not None else parse_value
+                if getattr(obj, attname) == parse_id:
+                    continue
+
+                if verbose:
+                    current_value = getattr(obj, field)
+                    if isinstance(current_value, str) and isinstance(parse_value, str):
+                        # Display a diff
+                        print(f'Updating {field} for {display_key(key)}')
+                        for line in difflib.ndiff([current_value], [parse_value]):
+                            print(line)
+                    else:
+                        print(f'Updating {field} for {display_key(key)} from `{current_value}` to `{parse_value}`.')
                 setattr(obj, field, parse_value)
-                updated = True
 
-        if updated:
-            obj.save()
+        if prepare:
+            prepare(obj)
+
+        if hasattr(obj, 'update_derived_fields'):
+            obj.update_derived_fields()
+
+        if not created:
+            changed = [field.attname for field in concrete_fields if getattr(obj, field.attname) != previous[field.attname]]
+            if changed:
+                update_fields.update(changed)
+                to_update.append(obj)
+
+        objs[key] = obj
+
+    if to_create:
+        if model._meta.parents:
+            # bulk_create() does not support multi-table inheritance
+            for obj in to_create:
+                obj.save()
+        else:
+            model.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+            _fill_primary_keys(model, to_create, attnames, get_key)
+
+    if to_update:
+        model.objects.bulk_update(to_update, sorted(update_fields), batch_size=BULK_BATCH_SIZE)
+
+    if delete:
+        stale_pks = [obj.pk for key, obj in existing.items() if key not in parsed]
+        if stale_pks:
+            print(f'!!! Deleting {len(stale_pks)} {model._meta.verbose_name_plural} no longer in game data')
+            queryset.filter(pk__in=stale_pks).delete()
+
+    return objs
+
+
+def sync_many_to_many(relation, parsed):
+    """Set a many-to-many relation such as `Monster.skills` for many objects at once.
+
+    `parsed` maps each object to the complete list of related objects. Rows of the through table
+    are added and removed with one bulk insert and one bulk delete.
+    """
+    field = relation.field
+    source_field = field.m2m_field_name()
+    target_field = field.m2m_reverse_field_name()
+
+    return sync_bestiary_objs(
+        relation.through,
+        {(obj.pk, related.pk): {} for obj, related_objs in parsed.items() for related in related_objs},
+        key_fields=(source_field, target_field),
+        queryset=relation.through.objects.filter(**{f'{source_field}__in': [obj.pk for obj in parsed]}),
+        delete=True,
+        verbose=False,
+    )
+
+
+def _fill_primary_keys(model, objs, attnames, get_key):
+    # Only PostgreSQL returns primary keys from bulk_create(), so look them up by key elsewhere
+    missing = [obj for obj in objs if obj.pk is None]
+    if not missing:
+        return
 
-    return obj
+    queryset = model.objects.filter(**{f'{attnames[0]}__in': {getattr(obj, attnames[0]) for obj in missing}})
+    pks = {get_key(obj): obj.pk for obj in queryset.only('pk', *attnames)}
+    for obj in missing:
+        obj.pk = pks[get_key(obj)]
+        obj._state.adding = False
+        obj._state.db = queryset.db
 
 
 def show_diff(seqm):
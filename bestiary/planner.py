@@ -0,0 +1,77 @@
+from collections import Counter
+
+from bestiary.models import AwakenCost, Fusion, GameItem, HomunculusSkillCraftCost, Monster, MonsterCraftCost
+
+
+def material_requirements(monster_ids, owned_monster_ids=(), homunculus_skill_ids=()):
+    """Items, fusion mana and base monsters needed to obtain every monster in `monster_ids`.
+
+    Monsters are obtained by awakening the monster they awaken from, by fusion, or by crafting
+    homunculus monsters. Monsters that can't be obtained any of those ways have to be summoned. Each
+    id in `owned_monster_ids` covers one monster anywhere in the tree. Costs of purchasing the
+    homunculus skills in `homunculus_skill_ids` are included. Ids may repeat, and unknown monster
+    ids raise a ValueError.
+
+    The monster graph is loaded with a few bulk queries and walked in memory.
+    """
+    monster_ids = list(monster_ids)
+    awakens_from = dict(Monster.objects.values_list('pk', 'awakens_from'))
+    unknown = sorted(set(monster_ids) - set(awakens_from))
+    if unknown:
+        raise ValueError(f'Unknown monster(s): {", ".join(str(pk) for pk in unknown)}')
+
+    fusions = {product: (pk, cost) for pk, product, cost in Fusion.objects.values_list('pk', 'product', 'cost')}
+    fusion_ingredients = {}
+    for product, ingredient in Fusion.ingredients.through.objects.values_list('fusion__product', 'monster'):
+        fusion_ingredients.setdefault(product, []).append(ingredient)
+    crafted = set(MonsterCraftCost.objects.values_list('monster', flat=True))
+
+    owned = Counter(owned_monster_ids)
+    awakenings = Counter()
+    crafts = Counter()
+    fusions_used = Counter()
+    summons = Counter()
+
+    def obtain(monster, path):
+        if owned[monster]:
+            owned[monster] -= 1
+        elif monster in path:
+            # Data error, don't follow it around again
+            summons[monster] += 1
+        elif awakens_from.get(monster):
+            awakenings[awakens_from[monster]] += 1
+            obtain(awakens_from[monster], path | {monster})
+        elif monster in fusions:
+            fusions_used[monster] += 1
+            for ingredient in fusion_ingredients.get(monster, []):
+                obtain(ingredient, path | {monster})
+        elif monster in crafted:
+            crafts[monster] += 1
+        else:
+            summons[monster] += 1
+
+    for monster in monster_ids:
+        obtain(monster, frozenset())
+
+    items = Counter()
+    for costs, counts, owner_field in [
+        (AwakenCost.objects, awakenings, 'monster'),
+        (MonsterCraftCost.objects, crafts, 'monster'),
+        (HomunculusSkillCraftCost.objects, Counter(homunculus_skill_ids), 'skill'),
+    ]:
+        if not counts:
+            continue
+
+        rows = costs.filter(**{f'{owner_field}__in': list(counts)}).values_list(owner_field, 'item', 'quantity')
+        for owner, item, quantity in rows:
+            items[item] += quantity * counts[owner]
+
+    return {
+        'items': [
+            {'item': item.pk, 'name': item.name, 'category': item.get_category_display(), 'quantity': items[item.pk]}
+            for item in GameItem.objects.filter(pk__in=list(items))
+        ],
+        'fusion_mana': sum(fusions[product][1] * count for product, count in fusions_used.items()),
+        'fusions': [{'fusion': fusions[product][0], 'quantity': count} for product, count in sorted(fusions_used.items())],
+        'summons': [{'monster': monster, 'quantity': count} for monster, count in sorted(summons.items())],
+    }
@@ -1,10 +1,26 @@
+import json
+
 from rest_framework import serializers
 
-from bestiary import models
+from bestiary import models, sprites
+
+
+class SpriteField(serializers.ReadOnlyField):
+    """Sprite atlas position of the image named by the source field, or null if it is not in an atlas"""
+
+    def __init__(self, directory, **kwargs):
+        self.directory = directory
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if value:
+            return sprites.get_sprite(self.directory, value)
+        return None
 
 
 class GameItemSerializer(serializers.ModelSerializer):
     category = serializers.SerializerMethodField()
+    icon_sprite = SpriteField('items', source='icon')
 
     class Meta:
         model = models.GameItem
@@ -15,6 +31,7 @@ class GameItemSerializer(serializers.ModelSerializer):
             'name',
             'category',
             'icon',
+            'icon_sprite',
             'description',
             'sell_value',
         ]
@@ -82,15 +99,17 @@ class SkillSerializer(serializers.HyperlinkedModelSerializer):
     upgrades = SkillUpgradeSerializer(many=True, read_only=True)
     effects = SkillEffectDetailSerializer(many=True, read_only=True, source='skilleffectdetail_set')
     scales_with = serializers.SerializerMethodField()
+    multiplier_formula_ast = serializers.SerializerMethodField()
     used_on = serializers.PrimaryKeyRelatedField(source='monster_set', many=True, read_only=True)
     other_skill = serializers.PrimaryKeyRelatedField(read_only=True)
+    icon_sprite = SpriteField('skills', source='icon_filename')
 
     class Meta:
         model = models.Skill
         fields = (
             'id', 'com2us_id', 'name', 'description', 'slot', 'cooltime', 'hits', 'passive', 'aoe', 'random',
             'max_level', 'upgrades', 'effects', 'multiplier_formula', 'multiplier_formula_raw',
-            'scales_with', 'icon_filename', 'used_on', 'level_progress_description', 'other_skill',
+            'multiplier_formula_ast', 'scales_with', 'icon_filename', 'icon_sprite', 'used_on', 'level_progress_description', 'other_skill',
         )
 
     def get_level_progress_description(self, instance):
@@ -103,6 +122,12 @@ class SkillSerializer(serializers.HyperlinkedModelSerializer):
         # TODO: Fix N+1 query in API response caused by this
         return instance.scaling_stats.values_list('stat', flat=True)
 
+    def get_multiplier_formula_ast(self, instance):
+        if instance.multiplier_formula_ast:
+            return json.loads(instance.multiplier_formula_ast)
+        else:
+            return None
+
 
 class LeaderSkillSerializer(serializers.ModelSerializer):
     attribute = serializers.SerializerMethodField('get_stat')
@@ -175,12 +200,13 @@ class MonsterSerializer(serializers.ModelSerializer):
     awaken_cost = AwakenCostSerializer(source='awakencost_set', many=True, read_only=True)
     homunculus_skills = serializers.PrimaryKeyRelatedField(source='homunculusskill_set', read_only=True, many=True)
     craft_materials = MonsterCraftCostSerializer(many=True, source='monstercraftcost_set', read_only=True)
+    image_sprite = SpriteField('monsters', source='image_filename')
 
     class Meta:
         model = models.Monster
         fields = (
             'id', 'url', 'bestiary_slug', 'com2us_id', 'family_id', 'skill_group_id',
-            'name', 'image_filename', 'element', 'archetype', 'base_stars', 'natural_stars',
+            'name', 'image_filename', 'image_sprite', 'element', 'archetype', 'base_stars', 'natural_stars',
             'obtainable', 'can_awaken', 'awaken_level', 'awaken_bonus',
             'skills', 'skill_ups_to_max', 'leader_skill', 'homunculus_skills',
             'base_hp', 'base_attack', 'base_defense', 'speed', 'crit_rate', 'crit_damage', 'resistance', 'accuracy',
@@ -198,9 +224,12 @@ class MonsterSerializer(serializers.ModelSerializer):
 
 
 class FusionSerializer(serializers.ModelSerializer):
+    awakening_cost = serializers.SerializerMethodField()
+    sub_fusion_available = serializers.SerializerMethodField()
+
     class Meta:
         model = models.Fusion
-        fields = ['id', 'url', 'product', 'cost', 'ingredients']
+        fields = ['id', 'url', 'product', 'cost', 'ingredients', 'awakening_cost', 'sub_fusion_available']
         extra_kwargs = {
             'url': {
                 'view_name': 'bestiary/fusions-detail',
@@ -208,6 +237,13 @@ class FusionSerializer(serializers.ModelSerializer):
         }
 
 
+    def get_awakening_cost(self, instance):
+        return instance.total_awakening_cost()
+
+    def get_sub_fusion_available(self, instance):
+        return instance.sub_fusion_available()
+
+
 class DungeonSerializer(serializers.ModelSerializer):
     url = serializers.HyperlinkedIdentityField(view_name='bestiary/dungeons-detail')
     levels = serializers.PrimaryKeyRelatedField(source='level_set', read_only=True, many=True)
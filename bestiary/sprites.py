@@ -0,0 +1,92 @@
+import json
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.contrib.staticfiles.templatetags.staticfiles import static
+from django.utils.html import format_html
+
+# Location of the atlases and sprite map written by the build_sprites parse stage, under the static root
+SPRITE_DIRECTORY = 'herders/images/sprites'
+SPRITE_MAP = 'sprites.json'
+
+_sprite_map = None
+
+
+def sprite_map():
+    # Loaded once per process from the collected static files, and again after clear_sprite_map().
+    # Empty until the atlases have been built and collected, so icons fall back to single images.
+    global _sprite_map
+    if _sprite_map is None:
+        name = f'{SPRITE_DIRECTORY}/{SPRITE_MAP}'
+        if staticfiles_storage.exists(name):
+            with staticfiles_storage.open(name) as f:
+                _sprite_map = json.load(f)
+        else:
+            _sprite_map = {'atlases': {}, 'sprites': {}}
+
+    return _sprite_map
+
+
+def clear_sprite_map():
+    # Called by build_sprites once it has written a new sprite map
+    global _sprite_map
+    _sprite_map = None
+
+
+def get_sprite(directory, filename):
+    """Atlas position of an image in herders/images/<directory>, or None if it is not part of an atlas.
+
+    Pixel coordinates are for clients drawing from the atlas themselves. The background values
+    are percentages, so they work at any display size.
+    """
+    sprites = sprite_map()
+    entry = sprites['sprites'].get(f'{directory}/{filename}')
+    if entry is None:
+        return None
+
+    atlas = sprites['atlases'][entry['atlas']]
+    cell_size = atlas['cell_size']
+    return {
+        'url': static(f'{SPRITE_DIRECTORY}/{atlas["file"]}'),
+        'x': entry['col'] * cell_size,
+        'y': entry['row'] * cell_size,
+        'width': cell_size,
+        'height': cell_size,
+        'background_position': f'{_percent(entry["col"], atlas["cols"])}% {_percent(entry["row"], atlas["rows"])}%',
+        'background_size': f'{atlas["cols"] * 100}% {atlas["rows"] * 100}%',
+    }
+
+
+def image_tag(directory, filename, css_class='', alt='', size=None):
+    """HTML for an image in herders/images/<directory>, drawn from its sprite atlas when there is one.
+
+    Sprites inherit their dimensions from `css_class` unless a `size` in pixels is given.
+    """
+    sprite = get_sprite(directory, filename)
+    dimensions = f'width: {size}px; height: {size}px; ' if size else ''
+
+    if sprite is None:
+        return format_html(
+            '<img src="{}" class="{}" alt="{}"{} loading="lazy" />',
+            static(f'herders/images/{directory}/{filename}'),
+            css_class,
+            alt,
+            format_html(' height="{}" width="{}"', size, size) if size else '',
+        )
+
+    return format_html(
+        '<span class="sprite {}" role="img" aria-label="{}" style="display: inline-block; {}'
+        'background: url({}) {} / {} no-repeat;"></span>',
+        css_class,
+        alt,
+        dimensions,
+        sprite['url'],
+        sprite['background_position'],
+        sprite['background_size'],
+    )
+
+
+def _percent(index, count):
+    # Percentage background positions are relative to the space left over, so the last cell is at 100%
+    if count == 1:
+        return 0
+    return round(index * 100 / (count - 1), 4)
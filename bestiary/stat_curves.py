@@ -0,0 +1,189 @@
+from math import log, exp
+
+import numpy as np
+
+# Magic multipliers taken from summoner's war wikia calculator. Used to calculate stats for lvl 1 and lvl MAX
+GRADE_MULTIPLIERS = np.array([
+    [1.0, 1.9958],
+    [1.9958, 3.03050646],
+    [3.03050646, 4.364426603],
+    [4.364426603, 5.941390935],
+    [5.941390935, 8.072330795],
+    [8.072330795, 10.97901633],
+])
+_GRADE_MULTIPLIERS = GRADE_MULTIPLIERS.tolist()
+
+GRADES = np.arange(1, len(GRADE_MULTIPLIERS) + 1)
+MAX_LEVELS = 10 + GRADES * 5
+LEVELS = np.arange(1, MAX_LEVELS[-1] + 1)
+_ABOVE_MAX_LEVEL = LEVELS > MAX_LEVELS[:, np.newaxis]
+
+# Part of the key of stored stat tables. Increase when the calculations below change so that
+# stored tables are recalculated.
+CURVE_VERSION = 1
+
+# Index of each stat in monster stat curves
+HP = 0
+ATK = 1
+DEF = 2
+
+
+def max_level(grade):
+    return 10 + grade * 5
+
+
+def actual_stat(stat, grade, level):
+    """Stat at a single grade and level"""
+    if stat is None:
+        return None
+
+    max_lvl = max_level(grade)
+    stat_lvl_1 = round(stat * _GRADE_MULTIPLIERS[grade - 1][0], 0)
+    stat_lvl_max = round(stat * _GRADE_MULTIPLIERS[grade - 1][1], 0)
+
+    if level == 1:
+        return int(stat_lvl_1)
+    elif level == max_lvl:
+        return int(stat_lvl_max)
+    else:
+        # Use exponential function in format value=ae^(bx)
+        # a=stat_lvl_1*e^(-b)
+        b_coeff = log(stat_lvl_max / stat_lvl_1) / (max_lvl - 1)
+
+        return int(round((stat_lvl_1 * exp(-b_coeff)) * exp(b_coeff * level)))
+
+
+def stat_curves(stats):
+    """Stat at every grade and level for any shape of array of base stats.
+
+    Returns an integer array indexed [..., grade - 1, level - 1] that is equal to `actual_stat()` for
+    every value. Levels above the max level of a grade and stats that are 0 or None are 0.
+    """
+    stats = np.asarray(stats, dtype=float)
+    base = np.nan_to_num(stats)[..., np.newaxis]
+    stat_lvl_1 = np.round(base * GRADE_MULTIPLIERS[:, 0])
+    stat_lvl_max = np.round(base * GRADE_MULTIPLIERS[:, 1])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        b_coeff = np.log(stat_lvl_max / stat_lvl_1) / (MAX_LEVELS - 1)
+        curves = (stat_lvl_1 * np.exp(-b_coeff))[..., np.newaxis] * np.exp(b_coeff[..., np.newaxis] * LEVELS)
+
+    # NumPy's exp and log can differ from the math module in the last bit, which only matters for
+    # values that are almost exactly halfway between two integers
+    near_half = np.abs(curves - np.floor(curves) - 0.5) < 1e-6
+    for index in zip(*np.nonzero(near_half)):
+        curves[index] = actual_stat(float(stats[index[:-2]]), index[-2] + 1, index[-1] + 1)
+
+    curves = np.rint(curves)
+    curves[..., GRADES - 1, 0] = stat_lvl_1
+    curves[..., GRADES - 1, MAX_LEVELS - 1] = stat_lvl_max
+    curves[..., _ABOVE_MAX_LEVEL] = 0
+    curves[~np.isfinite(curves)] = 0
+
+    return curves.astype(np.int64)
+
+
+def monster_stat_curves(monsters):
+    """HP, ATK and DEF at every grade and level for each monster, calculated together.
+
+    Returns an array indexed [monster, stat, grade - 1, level - 1], using the HP, ATK and DEF
+    constants for the stat index. HP includes the x15 multiplier, like `Monster.actual_hp()`. The
+    curves are also cached on each monster for its stat methods.
+    """
+    monsters = list(monsters)
+    curves = stat_curves([
+        [monster.raw_hp, monster.raw_attack, monster.raw_defense] for monster in monsters
+    ]).reshape(len(monsters), 3, len(GRADES), len(LEVELS))
+    curves[:, HP] *= 15
+
+    for monster, monster_curves in zip(monsters, curves):
+        monster._stat_curves = (monster.raw_hp, monster.raw_attack, monster.raw_defense), monster_curves
+
+    return curves
+
+
+def stat_chart(monster):
+    """Highcharts options for a chart of the monster's HP, ATK and DEF by level at each grade"""
+    chart_template = {
+        'chart': {
+            'type': 'line'
+        },
+        'title': {
+            'text': 'Stat Growth By Level'
+        },
+        'xAxis': {
+            'tickInterval': 5,
+            'showFirstLabel': True
+        },
+        'yAxis': [
+            {
+                'title': {
+                    'text': 'HP'
+                },
+                'id': 'hp',
+                'min': 0,
+                'opposite': True,
+                'endOnTick': False,
+            },
+            {
+                'title': {
+                    'text': 'ATK DEF'
+                },
+                'id': 'atkdef',
+                'min': 0,
+                'endOnTick': False,
+            }
+        ],
+        'series': None
+    }
+
+    curves = monster.stat_curves()
+
+    data_series = []
+
+    for grade in range(monster.natural_stars, 7):
+        max_level = monster.max_level_from_stars(grade)
+        data_series.append({
+            'name': 'HP ' + str(grade) + '*',
+            'data': _stat_curve_data(monster.raw_hp, curves[HP, grade - 1, :max_level]),
+            'pointStart': 1,
+            'visible': True if grade == 6 else False,
+            'yAxis': 'hp',
+        })
+        data_series.append({
+            'name': 'ATK ' + str(grade) + '*',
+            'data': _stat_curve_data(monster.raw_attack, curves[ATK, grade - 1, :max_level]),
+            'pointStart': 1,
+            'visible': True if grade == 6 else False,
+            'yAxis': 'atkdef',
+        })
+        data_series.append({
+            'name': 'DEF ' + str(grade) + '*',
+            'data': _stat_curve_data(monster.raw_defense, curves[DEF, grade - 1, :max_level]),
+            'pointStart': 1,
+            'visible': True if grade == 6 else False,
+            'yAxis': 'atkdef',
+        })
+
+    if data_series:
+        # Determine max values for Y axis
+        max_stat_value = round(max(
+            monster.max_lvl_hp / 15,
+            monster.max_lvl_attack,
+            monster.max_lvl_defense,
+        ))
+
+        chart_template['series'] = data_series
+        chart_template['yAxis'][0]['max'] = max_stat_value * 15
+        chart_template['yAxis'][1]['max'] = max_stat_value
+
+        return chart_template
+    else:
+        return {}
+
+
+def _stat_curve_data(raw_stat, curve):
+    # Chart points for each level, or empty points if the monster has no base value for the stat
+    if not raw_stat:
+        return [None] * len(curve)
+    return curve.tolist()
@@ -0,0 +1,39 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from bestiary import formulas
+
+
+class Parse(SimpleTestCase):
+    def test_parse_sum_of_products(self):
+        self.assertEqual(
+            formulas.parse('1.8*ATK + 2.5*DEF'),
+            ['+', ['*', 1.8, 'ATK'], ['*', 2.5, 'DEF']],
+        )
+
+    def test_parse_functions(self):
+        self.assertEqual(formulas.parse('Min(ATK, 2*DEF)'), ['min', 'ATK', ['*', 2, 'DEF']])
+
+    def test_parse_invalid(self):
+        with self.assertRaises(ValueError):
+            formulas.parse('ATK.__class__')
+
+    def test_variables(self):
+        expr = formulas.parse('ATK*(ATTACK_SPEED + 240)/60 + ATK')
+        self.assertEqual(formulas.variables(expr), ['ATK', 'ATTACK_SPEED'])
+
+
+class Compile(SimpleTestCase):
+    def test_scalar(self):
+        func = formulas.compile_expr(formulas.parse('ATK*(ATTACK_SPEED + 240)/60'))
+        self.assertEqual(func.variables, ('ATK', 'ATTACK_SPEED'))
+        self.assertAlmostEqual(func(ATK=1000, ATTACK_SPEED=60), 5000)
+
+    def test_vectorized(self):
+        func = formulas.compile_expr(formulas.parse('Max(1.8*ATK + 2.5*DEF, -ATK)'))
+        result = func(ATK=np.array([100, 200]), DEF=np.array([10, 20]))
+        np.testing.assert_allclose(result, [205, 410])
+
+    def test_unknown_operator(self):
+        with self.assertRaises(ValueError):
+            formulas.compile_expr(['import', 'ATK'])
@@ -0,0 +1,99 @@
+from collections import namedtuple
+
+from django.test import TestCase
+
+from bestiary.models import AwakenCost, ESSENCE_MAP, Fusion, GameItem, Monster
+
+# Stand-in for a monster instance in a player's collection
+Owned = namedtuple('Owned', 'monster')
+
+
+def create_monster(com2us_id, awakens_from=None, **awaken_costs):
+    monster = Monster.objects.create(
+        com2us_id=com2us_id, name=f'Monster {com2us_id}', element=Monster.ELEMENT_FIRE, base_stars=3, natural_stars=3,
+        awakens_from=awakens_from, is_awakened=awakens_from is not None,
+    )
+    for essence, quantity in awaken_costs.items():
+        element, size = essence.split('_')
+        item, _ = GameItem.objects.get_or_create(
+            com2us_id=ESSENCE_MAP[element][size], category=GameItem.CATEGORY_ESSENCE, defaults={'name': essence},
+        )
+        AwakenCost.objects.create(monster=monster, item=item, quantity=quantity)
+    return monster
+
+
+class FusionAwakeningCost(TestCase):
+    def setUp(self):
+        self.base_1 = create_monster(1, fire_low=10, magic_mid=5)
+        self.base_2 = create_monster(2, fire_low=4, dark_high=2)
+        self.ingredient_1 = create_monster(11, self.base_1)
+        self.ingredient_2 = create_monster(12, self.base_2)
+        self.unawakened_ingredient = create_monster(13)
+
+        self.fusion = Fusion.objects.create(product=create_monster(21), cost=100, meta_order=1)
+        self.fusion.ingredients.set([self.ingredient_1, self.ingredient_2, self.unawakened_ingredient])
+
+        # Its base monster can be fused, so the first fusion has a sub-fusion
+        self.sub_fusion = Fusion.objects.create(product=self.base_1, cost=50, meta_order=2)
+        self.sub_fusion.ingredients.set([self.unawakened_ingredient])
+
+    def test_total_awakening_cost(self):
+        with self.assertNumQueries(1):
+            cost = self.fusion.total_awakening_cost()
+
+        self.assertEqual(list(cost), ['magic', 'fire', 'water', 'wind', 'light', 'dark'])
+        self.assertEqual(cost['fire'], {'low': 14, 'mid': 0, 'high': 0})
+        self.assertEqual(cost['magic'], {'low': 0, 'mid': 5, 'high': 0})
+        self.assertEqual(cost['dark'], {'low': 0, 'mid': 0, 'high': 2})
+        self.assertEqual(self.sub_fusion.total_awakening_cost()['fire'], {'low': 0, 'mid': 0, 'high': 0})
+
+    def test_owned_ingredients_excluded(self):
+        cost = self.fusion.total_awakening_cost([Owned(self.ingredient_1)])
+        self.assertEqual(cost['fire']['low'], 4)
+        self.assertEqual(cost['magic']['mid'], 0)
+
+    def test_sub_fusion_available(self):
+        self.assertTrue(self.fusion.sub_fusion_available())
+        self.assertFalse(self.sub_fusion.sub_fusion_available())
+
+    def test_with_awakening_cost(self):
+        expected = [(fusion.total_awakening_cost(), fusion.sub_fusion_available()) for fusion in Fusion.objects.all()]
+
+        with self.assertNumQueries(1):
+            annotated = [
+                (fusion.total_awakening_cost(), fusion.sub_fusion_available())
+                for fusion in Fusion.objects.with_awakening_cost()
+            ]
+
+        self.assertEqual(annotated, expected)
+
+    def test_with_awakening_cost_owned_ingredients(self):
+        fusion = Fusion.objects.with_awakening_cost([Owned(self.ingredient_2)]).get(pk=self.fusion.pk)
+        self.assertEqual(fusion.total_awakening_cost(), self.fusion.total_awakening_cost([Owned(self.ingredient_2)]))
+
+
+class AwakeningMaterials(TestCase):
+    def setUp(self):
+        self.base_1 = create_monster(1, fire_low=10, magic_mid=5)
+        self.base_2 = create_monster(2, fire_low=4, dark_high=2)
+
+    def test_monster(self):
+        with self.assertNumQueries(1):
+            mats = self.base_1.awakening_materials
+            self.assertEqual(self.base_1.get_awakening_materials(), mats)
+
+        self.assertEqual(list(mats), ['magic', 'fire', 'water', 'wind', 'light', 'dark'])
+        self.assertEqual(mats['fire'], {'low': 10, 'mid': 0, 'high': 0})
+        self.assertEqual(mats['magic']['mid'], 5)
+
+    def test_prefetched(self):
+        monster = Monster.objects.prefetch_related('awakencost_set__item').get(pk=self.base_2.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(monster.awakening_materials['dark']['high'], 2)
+
+    def test_queryset_total(self):
+        with self.assertNumQueries(1):
+            mats = Monster.objects.filter(pk__in=[self.base_1.pk, self.base_2.pk]).awakening_materials()
+
+        self.assertEqual(mats['fire'], {'low': 14, 'mid': 0, 'high': 0})
+        self.assertEqual(mats['dark']['high'], 2)
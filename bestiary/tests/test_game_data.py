@@ -0,0 +1,217 @@
+import base64
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from Crypto.Cipher import AES
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from bestiary.parse import game_data
+from bestiary.parse.game_data import _DecodeCache, _LocalValueData, _Strings
+
+VERSION = b'6.2.4'
+TABLES = {
+    1: 'level\txp\n1\t0\n2\t120',
+    2: 'unit_master_id\tname\tawaken_mats\n10111\tFairy\t[[11002, 5]]\n10211\tElucia',
+}
+STRINGS = [
+    {1: 'Island'},
+    {10111: 'Fairy', 10211: 'Elucia'},
+]
+
+
+def localvalue_file():
+    tables = b''
+    table_defs = b''
+    for num, text in TABLES.items():
+        encoded = text.encode()
+        table_defs += _LocalValueData.TABLE_DEF.pack(num, len(tables), len(tables) + len(encoded))
+        tables += encoded
+
+    data = VERSION.ljust(_LocalValueData.TABLE_COUNT_POS, b'\x00')
+    data += struct.pack('<i', len(TABLES) + 1).ljust(_LocalValueData.TABLE_DEFS_POS - _LocalValueData.TABLE_COUNT_POS, b'\x00')
+    data += table_defs + tables
+
+    # Encrypted the same way as the game client's mode 0x0300 data
+    compressed = zlib.compress(data)
+    compressed += b'\x00' * (-len(compressed) % AES.block_size)
+    cipher = AES.new(bytes.fromhex(settings.SUMMONERS_WAR_KEY), AES.MODE_CBC, bytes.fromhex(settings.SUMMONERS_WAR_IV))
+    return base64.encodebytes(cipher.encrypt(compressed))
+
+
+def strings_file():
+    data = struct.pack('<i', 1)
+    for tbl in STRINGS:
+        data += struct.pack('<i', len(tbl))
+        for str_id, text in tbl.items():
+            encoded = text.encode() + b'\x00\x00'
+            data += struct.pack('<2i', str_id, len(encoded)) + encoded
+
+    return data
+
+
+class GameDataTestCase(SimpleTestCase):
+    """Points the game data loaders at small generated files and a temporary decode cache."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = tmp.name
+        self.localvalue_path = os.path.join(self.path, 'localvalue.dat')
+        self.strings_path = os.path.join(self.path, 'text_eng.dat')
+        self._write(self.localvalue_path, localvalue_file())
+        self._write(self.strings_path, strings_file())
+
+        for target, attribute, value in [
+            # CBC cipher objects carry state over from previous messages
+            (game_data.DefaultCipher, 'cipher', None),
+            (game_data.JokerCipher, 'cipher', None),
+            (_DecodeCache, 'directory', os.path.join(self.path, 'cache')),
+            (_DecodeCache, '_digests', {}),
+            (_LocalValueData, 'filename', self.localvalue_path),
+            (_LocalValueData, '_tables', {}),
+            (_LocalValueData, '_num_tables', None),
+            (_LocalValueData, '_table_offsets', {}),
+            (_LocalValueData, '_decrypted_data', None),
+            (_LocalValueData, 'TABLE_START_POS', None),
+            (_Strings, 'filename', self.strings_path),
+            (_Strings, 'version', None),
+            (_Strings, '_data', None),
+            (_Strings, '_table_offsets', []),
+            (_Strings, '_tables', {}),
+        ]:
+            patcher = mock.patch.object(target, attribute, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _write(self, path, data):
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    def reset_loaders(self):
+        # Forget everything loaded in this process, leaving only the on-disk cache
+        game_data.DefaultCipher.cipher = None
+        game_data.JokerCipher.cipher = None
+        _DecodeCache._digests = {}
+        _LocalValueData._tables = {}
+        _LocalValueData._num_tables = None
+        _LocalValueData._table_offsets = {}
+        _LocalValueData._decrypted_data = None
+        _Strings._data = None
+        _Strings._table_offsets = []
+        _Strings._tables = {}
+
+
+class Decrypt(GameDataTestCase):
+    def test_localvalue(self):
+        self.assertEqual(game_data.tables.version, VERSION.decode())
+        self.assertEqual(len(game_data.tables), len(TABLES))
+        self.assertEqual(game_data.tables[1][2]['xp'], 120)
+
+    def test_joker_container(self):
+        plaintext = b'{"unit_master_id": 10111}'
+        cipher = AES.new(bytes.fromhex(settings.JOKER_CONTAINER_KEY), AES.MODE_CBC, bytes.fromhex(settings.JOKER_CONTAINER_IV))
+        encrypted = cipher.encrypt(plaintext.ljust(32, b'\x00'))
+        data = zlib.compress(base64.b64encode(encrypted.hex().encode()) + b'\x00')
+
+        container = game_data.JokerContainerFile(b'Joker' + struct.pack('<H', 0x0200) + b'\x01' + data, read=False)
+        self.assertEqual(container.data, plaintext)
+
+
+class DecodeCache(GameDataTestCase):
+    def test_digest_reused_while_file_unchanged(self):
+        with mock.patch.object(game_data.hashlib, 'sha256', wraps=game_data.hashlib.sha256) as sha256:
+            path = _DecodeCache.path(self.strings_path, 'idx')
+            self.assertEqual(_DecodeCache.path(self.strings_path, 'idx'), path)
+            self.assertEqual(sha256.call_count, 1)
+
+            self._write(self.strings_path, strings_file() + b'\x00')
+            self.assertNotEqual(_DecodeCache.path(self.strings_path, 'idx'), path)
+            self.assertEqual(sha256.call_count, 2)
+
+    def test_entries_of_other_decoder_versions_replaced(self):
+        self.assertEqual(game_data.tables[2][10211]['name'], 'Elucia')
+        old_path = _DecodeCache.path(self.localvalue_path, 'table2')
+        self.reset_loaders()
+
+        with mock.patch.object(_DecodeCache, '_decoder_hash', '0' * 12), \
+                mock.patch.object(_LocalValueData, '_parse_table', wraps=_LocalValueData._parse_table) as parse_table:
+            self.assertEqual(game_data.tables[2][10211]['name'], 'Elucia')
+            self.assertTrue(os.path.exists(_DecodeCache.path(self.localvalue_path, 'table2')))
+
+        parse_table.assert_called_once()
+        self.assertFalse(os.path.exists(old_path))
+
+    def test_decoded_tables_cached(self):
+        self.assertEqual(game_data.tables[2][10211]['name'], 'Elucia')
+        self.assertEqual(game_data.strings[1][10111], 'Fairy')
+        self.reset_loaders()
+
+        with mock.patch.object(_LocalValueData, '_get_raw_data') as get_raw_data, \
+                mock.patch.object(_Strings, '_get_data') as get_data:
+            monsters = game_data.tables[2]
+            self.assertEqual(game_data.strings[1], STRINGS[1])
+
+        get_raw_data.assert_not_called()
+        get_data.assert_not_called()
+        self.assertEqual(dict(monsters[10111]), {'unit_master_id': 10111, 'name': 'Fairy', 'awaken_mats': [[11002, 5]]})
+        self.assertNotIn('awaken_mats', monsters[10211])
+
+
+class ConcurrentLoading(GameDataTestCase):
+    def test_cold_cache(self):
+        # Like two parse stages reading game data at once. Cache lookups are slowed down so both
+        # threads are loading at the same time.
+        load_object = _DecodeCache.load_object
+        barrier = threading.Barrier(2)
+
+        def slow_load_object(path):
+            time.sleep(0.05)
+            return load_object(path)
+
+        def stage():
+            barrier.wait()
+            return len(game_data.strings), game_data.strings[1], len(game_data.tables), dict(game_data.tables[2][10111])
+
+        with mock.patch.object(_DecodeCache, 'load_object', slow_load_object), ThreadPoolExecutor(2) as executor:
+            results = [future.result() for future in [executor.submit(stage), executor.submit(stage)]]
+
+        expected = (len(STRINGS), STRINGS[1], len(TABLES), {'unit_master_id': 10111, 'name': 'Fairy', 'awaken_mats': [[11002, 5]]})
+        self.assertEqual(results, [expected, expected])
+        self.assertIs(results[0][1], results[1][1])
+
+        # Nothing corrupt was written to the decode cache either
+        self.reset_loaders()
+        self.assertEqual(len(game_data.strings), len(STRINGS))
+
+
+class CorruptFiles(GameDataTestCase):
+    def test_truncated_string_header(self):
+        # A table of one string, cut off in the middle of the string's id and length
+        data = strings_file()
+        self._write(self.strings_path, data + struct.pack('<2i', 1, 10111)[:6])
+
+        with self.assertRaisesRegex(ValueError, rf'text_eng\.dat: .* offset {len(data) + 4:#x}'):
+            len(game_data.strings)
+
+    def test_truncated_table_definitions(self):
+        data = VERSION.ljust(_LocalValueData.TABLE_COUNT_POS, b'\x00') + struct.pack('<i', len(TABLES) + 1)
+        data = data.ljust(_LocalValueData.TABLE_DEFS_POS, b'\x00') + _LocalValueData.TABLE_DEF.pack(1, 0, 10)
+
+        with mock.patch.object(game_data.JokerContainerFile, '_process_mode_300', return_value=data):
+            with self.assertRaisesRegex(ValueError, r'localvalue\.dat: .* table definition at offset 0x40'):
+                game_data.tables[1]
+
+    def test_table_out_of_range(self):
+        data = VERSION.ljust(_LocalValueData.TABLE_COUNT_POS, b'\x00') + struct.pack('<i', 2)
+        data = data.ljust(_LocalValueData.TABLE_DEFS_POS, b'\x00') + _LocalValueData.TABLE_DEF.pack(1, 0, 10) + b'level'
+
+        with mock.patch.object(game_data.JokerContainerFile, '_process_mode_300', return_value=data):
+            with self.assertRaisesRegex(ValueError, r'localvalue\.dat: .* table at offset 0x40'):
+                game_data.tables[1]
@@ -0,0 +1,57 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from bestiary.models import Monster, MonsterStatTable
+
+
+class UpdateDerivedFields(TestCase):
+    def setUp(self):
+        self.base = Monster.objects.create(
+            com2us_id=10111, name='Fairy', element=Monster.ELEMENT_WATER, base_stars=2, natural_stars=2,
+            raw_hp=723, raw_attack=1134, raw_defense=500,
+        )
+        self.awakened = Monster.objects.create(
+            com2us_id=10211, name='Elucia', element=Monster.ELEMENT_WATER, base_stars=3, natural_stars=2,
+            is_awakened=True, awakens_from=self.base, raw_hp=800, raw_attack=1200, raw_defense=550,
+        )
+        self.base.awakens_to = self.awakened
+        self.base.save()
+
+        # Outdated values, like after a formula change
+        Monster.objects.update(base_hp=1, max_lvl_attack=None, bestiary_slug='outdated')
+
+    def test_recalculated(self):
+        updated = Monster.objects.all().update_derived_fields()
+        self.assertEqual(len(updated), 2)
+
+        for monster in Monster.objects.all():
+            expected = Monster.objects.get(pk=monster.pk)
+            expected.update_derived_fields()
+            self.assertEqual(monster.base_hp, expected.base_hp)
+            self.assertEqual(monster.max_lvl_attack, expected.max_lvl_attack)
+
+        self.base.refresh_from_db()
+        self.awakened.refresh_from_db()
+        self.assertEqual(self.base.bestiary_slug, '10111-water-fairy-elucia')
+        self.assertEqual(self.awakened.bestiary_slug, self.base.bestiary_slug)
+
+    def test_only_selected_saved(self):
+        Monster.objects.filter(pk=self.awakened.pk).update_derived_fields()
+        self.base.refresh_from_db()
+        self.awakened.refresh_from_db()
+
+        self.assertEqual(self.base.bestiary_slug, 'outdated')
+        self.assertEqual(self.awakened.bestiary_slug, '10111-water-fairy-elucia')
+
+    def test_unchanged_not_saved(self):
+        Monster.objects.all().update_derived_fields()
+        self.assertEqual(Monster.objects.all().update_derived_fields(), [])
+
+    def test_command(self):
+        out = StringIO()
+        call_command('update_monster_fields', stdout=out)
+        self.assertIn('Updated 2 of 2 monsters', out.getvalue())
+        self.assertIn('Updated stat tables of 2 monsters', out.getvalue())
+        self.assertEqual(MonsterStatTable.objects.count(), 2)
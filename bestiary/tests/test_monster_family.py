@@ -0,0 +1,82 @@
+from django.test import TestCase
+
+from bestiary.models import Monster
+
+
+class MonsterChain(TestCase):
+    def setUp(self):
+        self.base = Monster.objects.create(
+            com2us_id=10111, family_id=101, name='Fairy', element=Monster.ELEMENT_WATER, base_stars=2, natural_stars=2,
+        )
+        self.awakened = Monster.objects.create(
+            com2us_id=10211, family_id=101, name='Elucia', element=Monster.ELEMENT_WATER, base_stars=3, natural_stars=2,
+            is_awakened=True, awakens_from=self.base,
+        )
+        self.second = Monster.objects.create(
+            com2us_id=10311, family_id=101, name='Elucia', element=Monster.ELEMENT_WATER, base_stars=4, natural_stars=2,
+            is_awakened=True, awaken_level=Monster.AWAKEN_LEVEL_SECOND, awakens_from=self.awakened,
+        )
+        self.base.awakens_to = self.awakened
+        self.base.save()
+        self.awakened.awakens_to = self.second
+        self.awakened.save()
+
+        self.other_element = Monster.objects.create(
+            com2us_id=10112, family_id=101, name='Fairy', element=Monster.ELEMENT_FIRE, base_stars=2, natural_stars=2,
+            can_awaken=False,
+        )
+        self.other_family = Monster.objects.create(
+            com2us_id=10411, family_id=104, name='Imp', element=Monster.ELEMENT_WATER, base_stars=2, natural_stars=2,
+        )
+
+    def test_chain_fields(self):
+        self.assertEqual(
+            [(mon.chain_base_id, mon.chain_position) for mon in (self.base, self.awakened, self.second)],
+            [(None, 0), (self.base.pk, 1), (self.base.pk, 2)],
+        )
+
+    def test_unobtainable_base_starts_own_chain(self):
+        self.base.obtainable = False
+        self.base.save()
+        self.awakened.save()
+        self.assertEqual((self.awakened.chain_base_id, self.awakened.chain_position), (None, 0))
+
+    def test_awakened_forms_updated_on_save(self):
+        self.base.obtainable = False
+        self.base.save()
+
+        self.assertEqual(
+            list(Monster.objects.filter(pk__in=[self.awakened.pk, self.second.pk]).order_by('com2us_id').values_list('chain_base', 'chain_position')),
+            [(None, 0), (self.awakened.pk, 1)],
+        )
+
+    def test_awakened_forms_renamed(self):
+        self.base.name = 'Pixie'
+        self.base.save()
+
+        self.awakened.refresh_from_db()
+        self.assertEqual(self.awakened.bestiary_slug, self.base.bestiary_slug)
+
+    def test_awakened_forms_not_loaded_on_plain_save(self):
+        monster = Monster.objects.select_related('awakens_to').get(pk=self.base.pk)
+        monster.awaken_bonus = 'Increases the Attack Speed by 10%'
+
+        with self.assertNumQueries(1):
+            monster.save()
+
+    def test_detail_page_monsters(self):
+        with self.assertNumQueries(1):
+            chain, family = Monster.detail_page_monsters(self.second)
+            self.assertEqual(chain[1].awakens_to.name, 'Elucia')
+
+        self.assertEqual(chain, [self.base, self.awakened, self.second])
+        self.assertEqual(family, list(self.second.monster_family()))
+        self.assertEqual(family, [self.other_element, self.second])
+
+    def test_bulk_update(self):
+        Monster.objects.update(chain_base=None, chain_position=0)
+        Monster.objects.all().update_derived_fields()
+        self.assertEqual(
+            list(Monster.objects.filter(family_id=101).order_by('com2us_id').values_list('chain_base', 'chain_position')),
+            [(None, 0), (None, 0), (self.base.pk, 1), (self.base.pk, 2)],
+        )
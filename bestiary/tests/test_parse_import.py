@@ -0,0 +1,47 @@
+import json
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+# Importing the parse package should not decode game data or load sympy/pycryptodome. Checked in a
+# fresh interpreter, as other tests load all of them.
+IMPORT_SCRIPT = '''
+import json
+import sys
+
+import django
+django.setup()
+
+import bestiary.parse
+
+from bestiary.parse import game_data
+print(json.dumps({
+    'sympy': 'sympy' in sys.modules,
+    'crypto': any(module.split('.')[0] in ('Crypto', 'Cryptodome') for module in sys.modules),
+    'tables_loaded': game_data._LocalValueData._decrypted_data is not None,
+    'strings_loaded': bool(game_data._Strings._table_offsets),
+}))
+'''
+
+
+class ParseImport(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        output = subprocess.run(
+            [sys.executable, '-c', IMPORT_SCRIPT],
+            cwd=settings.BASE_DIR,
+            check=True,
+            stdout=subprocess.PIPE,
+        ).stdout
+        cls.result = json.loads(output.decode().splitlines()[-1])
+
+    def test_game_data_not_loaded(self):
+        self.assertFalse(self.result['tables_loaded'])
+        self.assertFalse(self.result['strings_loaded'])
+
+    def test_heavy_dependencies_not_loaded(self):
+        self.assertFalse(self.result['sympy'])
+        self.assertFalse(self.result['crypto'])
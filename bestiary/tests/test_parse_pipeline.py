@@ -0,0 +1,114 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest import mock
+
+from django.test import SimpleTestCase, TransactionTestCase
+
+from bestiary import models
+from bestiary.parse import pipeline
+from bestiary.parse.pipeline import STAGES, Stage, completed_stages, run_stages, select_stages
+
+
+class SelectStages(SimpleTestCase):
+    def test_all(self):
+        self.assertEqual([stage.name for stage in select_stages()], list(STAGES))
+
+    def test_only(self):
+        self.assertEqual([stage.name for stage in select_stages(only=['monsters', 'skills'])], ['skills', 'monsters'])
+
+    def test_skip(self):
+        names = [stage.name for stage in select_stages(skip=['decrypt_images', 'crop_images'])]
+        self.assertNotIn('decrypt_images', names)
+        self.assertIn('skills', names)
+
+    def test_unknown_stage(self):
+        with self.assertRaises(ValueError):
+            select_stages(only=['monstres'])
+
+
+class RunStages(TransactionTestCase):
+    def setUp(self):
+        self.order = []
+        self.lock = threading.Lock()
+
+    def _stage(self, name, dependencies=()):
+        def func():
+            with self.lock:
+                self.order.append(name)
+
+        return Stage(name, func, name, dependencies, uses_context=False)
+
+    def test_dependencies_run_first(self):
+        stages = [
+            self._stage('monsters', ['skills']),
+            self._stage('skills'),
+            self._stage('secret_dungeons', ['monsters']),
+            self._stage('scenarios'),
+        ]
+        timings = run_stages(stages, log=lambda msg: None)
+
+        self.assertEqual(set(timings), {'monsters', 'skills', 'secret_dungeons', 'scenarios'})
+        self.assertLess(self.order.index('skills'), self.order.index('monsters'))
+        self.assertLess(self.order.index('monsters'), self.order.index('secret_dungeons'))
+
+    def test_unselected_dependencies_ignored(self):
+        run_stages([self._stage('monsters', ['skills'])], log=lambda msg: None)
+        self.assertEqual(self.order, ['monsters'])
+
+    def test_failure_stops_dependent_stages(self):
+        def fail():
+            raise RuntimeError('Parse failed')
+
+        stages = [Stage('skills', fail, 'skills', uses_context=False), self._stage('monsters', ['skills'])]
+        with self.assertRaises(RuntimeError):
+            run_stages(stages, log=lambda msg: None)
+        self.assertEqual(self.order, [])
+
+
+class ProcessWorkers(TransactionTestCase):
+    def test_started_before_thread_stages(self):
+        submitted = []
+
+        class Threads(ThreadPoolExecutor):
+            def submit(self, fn, *args):
+                submitted.append(args[0].name)
+                return super().submit(fn, *args)
+
+        class Processes(ProcessPoolExecutor):
+            def submit(self, fn, *args):
+                submitted.append(fn.__name__)
+                # Stands in for the real stage, which would process the static files
+                return super().submit(pipeline._start_worker)
+
+        stages = [Stage('skills', lambda: None, '', uses_context=False), STAGES['decrypt_images']]
+        with mock.patch.object(pipeline, 'ThreadPoolExecutor', Threads), mock.patch.object(pipeline, 'ProcessPoolExecutor', Processes):
+            run_stages(stages, log=lambda msg: None)
+
+        self.assertEqual(submitted, ['_start_worker', 'skills', '_run_in_process'])
+
+
+class Checkpoints(TransactionTestCase):
+    def _create_item(self):
+        models.GameItem.objects.create(category=models.GameItem.CATEGORY_CRAFT_STUFF, com2us_id=1, name='Rainbowmon')
+
+    def test_checkpoint_recorded(self):
+        run_stages([Stage('craft_materials', self._create_item, '', uses_context=False)], log=lambda msg: None, version='6.2.4')
+        self.assertEqual(completed_stages('6.2.4'), {'craft_materials'})
+        self.assertEqual(completed_stages('6.2.5'), set())
+
+    def test_parser_change_invalidates_checkpoints(self):
+        run_stages([Stage('craft_materials', self._create_item, '', uses_context=False)], log=lambda msg: None, version='6.2.4')
+
+        with mock.patch.object(pipeline, 'parser_hash', return_value='0' * 64):
+            self.assertEqual(completed_stages('6.2.4'), set())
+
+    def test_failed_stage_rolled_back(self):
+        def fail():
+            self._create_item()
+            raise RuntimeError('Parse failed')
+
+        with self.assertRaises(RuntimeError):
+            run_stages([Stage('craft_materials', fail, '', uses_context=False)], log=lambda msg: None, version='6.2.4')
+
+        self.assertFalse(models.GameItem.objects.exists())
+        self.assertEqual(completed_stages('6.2.4'), set())
@@ -0,0 +1,65 @@
+import importlib
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from bestiary.models import ScalingStat, Skill
+from bestiary.parse import game_data
+from bestiary.parse.context import ParseContext
+from bestiary.parse.util import sync_many_to_many
+
+# The parse package exports the `skills` stage function under the module's name
+skills = importlib.import_module('bestiary.parse.skills')
+
+
+class SimplifiedFormulaMemo(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+
+        for target, attribute, value in [
+            (game_data._DecodeCache, 'directory', tmp.name),
+            (skills, '_simplified_formulas_path', os.path.join(tmp.name, 'simplified_formulas.pkl')),
+            (skills, '_simplified_formulas', None),
+        ]:
+            patcher = mock.patch.object(target, attribute, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_discarded_for_other_sympy_version(self):
+        game_data._DecodeCache.store_object(skills._simplified_formulas_path, {'0.1': {'((ATK*2))': 'stale'}})
+        self.assertEqual(skills._get_simplified_formulas(), {})
+
+        with mock.patch.object(skills, '_sympy_version', return_value='0.1'):
+            skills._simplified_formulas = None
+            self.assertEqual(skills._get_simplified_formulas(), {'((ATK*2))': 'stale'})
+
+
+class Errata(SimpleTestCase):
+    @mock.patch.dict(skills._preprocess_erratum, {1: [lambda raw: dict(raw, fixed=True)]})
+    def test_preprocess_quiet(self):
+        with mock.patch('builtins.print') as mock_print:
+            self.assertEqual(skills.preprocess_errata(1, {}, verbose=False), {'fixed': True})
+            skills.preprocess_errata(1, {})
+
+        self.assertEqual(mock_print.call_count, 1)
+
+
+class ScalingStatErrata(TestCase):
+    def setUp(self):
+        self.context = ParseContext()
+        for desc in ['ATK', 'ATTACK_TOT_HP']:
+            self.context.add(ScalingStat.objects.create(stat=desc, com2us_desc=desc, description=desc))
+        self.skill = Skill.objects.create(com2us_id=5663, name='Shakan S3', description='', max_level=1)
+
+    def test_applied_before_sync(self):
+        scaling_stats = skills.postprocess_errata(5663, [self.context.scaling_stat('ATK')], self.context)
+        self.assertEqual([stat.com2us_desc for stat in scaling_stats], ['ATK', 'ATTACK_TOT_HP'])
+        sync_many_to_many(Skill.scaling_stats, {self.skill: scaling_stats})
+
+        # A parse run with the same data leaves the relation alone
+        scaling_stats = skills.postprocess_errata(5663, [self.context.scaling_stat('ATK')], self.context)
+        with self.assertNumQueries(1):
+            sync_many_to_many(Skill.scaling_stats, {self.skill: scaling_stats})
@@ -0,0 +1,116 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from PIL import Image
+from django.test import SimpleTestCase
+
+from bestiary import models
+from bestiary.parse import static
+from bestiary.parse.context import ParseContext
+from bestiary.parse.game_data import _DecodeCache
+
+PNG = b'\x89PNG\r\n\x1a\n' + bytes(range(256))
+
+
+def encrypt(bts):
+    encrypt_table = bytes(static.com2us_decrypt_values.index(value) for value in range(256))
+    return bts[:7] + b'\x0B' + bts[8:].translate(encrypt_table)
+
+
+class ImageTestCase(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = tmp.name
+        self.im_path = os.path.join(self.path, 'unit_icon_0001_0_0.png')
+
+        cache_dir = mock.patch.object(_DecodeCache, 'directory', os.path.join(self.path, 'cache'))
+        cache_dir.start()
+        self.addCleanup(cache_dir.stop)
+
+    def _write(self, bts):
+        with open(self.im_path, 'wb') as f:
+            f.write(bts)
+
+    def _read(self):
+        with open(self.im_path, 'rb') as f:
+            return f.read()
+
+
+class DecryptImages(ImageTestCase):
+    def test_decrypt(self):
+        self._write(encrypt(PNG))
+        static.decrypt_images(path=self.path)
+        self.assertEqual(self._read(), PNG)
+
+    def test_unencrypted_unchanged(self):
+        self._write(PNG)
+        static.decrypt_images(path=self.path)
+        self.assertEqual(self._read(), PNG)
+
+    def test_processed_files_skipped(self):
+        self._write(encrypt(PNG))
+        static.decrypt_images(path=self.path)
+
+        with mock.patch.object(static, '_decrypt_image') as decrypt_image:
+            static.decrypt_images(path=self.path)
+        decrypt_image.assert_not_called()
+
+
+class CropImages(ImageTestCase):
+    def test_crop_border(self):
+        Image.new('RGBA', (102, 102)).save(self.im_path)
+        summary = static.crop_images(path=self.path)
+
+        self.assertEqual(summary['cropped'], 1)
+        with Image.open(self.im_path) as im:
+            self.assertEqual(im.size, (100, 100))
+
+    def test_summary(self):
+        Image.new('RGBA', (100, 100)).save(self.im_path)
+        self.assertEqual(static.crop_images(path=self.path), {'unchanged': 1, 'skipped': 0})
+        self.assertEqual(static.crop_images(path=self.path), {'skipped': 1})
+
+
+class BuildSprites(ImageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.context = ParseContext()
+        self.context.monsters[1] = models.Monster(com2us_id=1, image_filename='unit_icon_0001_0_0.png', element='fire')
+
+        for image in ['monsters/unit_icon_0001_0_0.png', 'monsters/devilmon_dark.png', 'skills/skill_icon_0003_0_0.png', 'elements/fire.png']:
+            os.makedirs(os.path.join(self.path, os.path.dirname(image)), exist_ok=True)
+            Image.new('RGBA', (100, 100), 'red').save(os.path.join(self.path, image))
+
+    def _sprite_map(self):
+        with open(os.path.join(self.path, 'sprites', 'sprites.json')) as f:
+            return json.load(f)
+
+    def test_atlases(self):
+        static.build_sprites(self.context, path=self.path)
+        sprite_map = self._sprite_map()
+
+        self.assertEqual(
+            {image: entry['atlas'] for image, entry in sprite_map['sprites'].items()},
+            {
+                'monsters/unit_icon_0001_0_0.png': 'monsters-fire',
+                'monsters/devilmon_dark.png': 'monsters-other',
+                'skills/skill_icon_0003_0_0.png': 'skills-0003',
+                'elements/fire.png': 'elements',
+            },
+        )
+        with Image.open(os.path.join(self.path, 'sprites', 'elements.webp')) as im:
+            self.assertEqual(im.size, (30, 30))
+
+    def test_unchanged_atlases_skipped(self):
+        static.build_sprites(self.context, path=self.path)
+        self.assertEqual(static.build_sprites(self.context, path=self.path), {'unchanged': 4})
+
+    def test_stale_atlas_removed(self):
+        static.build_sprites(self.context, path=self.path)
+        os.remove(os.path.join(self.path, 'elements', 'fire.png'))
+
+        self.assertEqual(static.build_sprites(self.context, path=self.path), {'unchanged': 3, 'removed': 1})
+        self.assertFalse(os.path.exists(os.path.join(self.path, 'sprites', 'elements.webp')))
@@ -0,0 +1,74 @@
+from django.test import TestCase
+
+from bestiary import models
+from bestiary.parse.util import sync_bestiary_objs, sync_many_to_many
+
+
+class SyncBestiaryObjs(TestCase):
+    def setUp(self):
+        self.dungeon = models.Dungeon.objects.create(com2us_id=1, category=models.Dungeon.CATEGORY_SCENARIO, name='Garen Forest')
+        self.level = models.Level.objects.create(dungeon=self.dungeon, floor=1, energy_cost=3)
+
+    def test_create(self):
+        objs = sync_bestiary_objs(models.Dungeon, {2: {'name': 'Mt Siz', 'category': models.Dungeon.CATEGORY_SCENARIO}})
+        self.assertIsNotNone(objs[2].pk)
+        self.assertEqual(models.Dungeon.objects.get(com2us_id=2).slug, 'mt-siz')
+
+    def test_update(self):
+        sync_bestiary_objs(models.Dungeon, {1: {'name': 'Mt White Ragon'}})
+        self.dungeon.refresh_from_db()
+        self.assertEqual(self.dungeon.name, 'Mt White Ragon')
+        self.assertEqual(self.dungeon.slug, 'mt-white-ragon')
+
+    def test_unchanged_rows_not_written(self):
+        with self.assertNumQueries(1):
+            sync_bestiary_objs(models.Dungeon, {1: {'name': 'Garen Forest'}})
+
+    def test_composite_key(self):
+        objs = sync_bestiary_objs(
+            models.Level,
+            {
+                (self.dungeon.pk, 1): {'energy_cost': 4},
+                (self.dungeon.pk, 2): {'energy_cost': 5},
+            },
+            key_fields=('dungeon', 'floor'),
+        )
+        self.assertEqual(objs[(self.dungeon.pk, 1)].pk, self.level.pk)
+        self.assertEqual(
+            list(models.Level.objects.values_list('floor', 'energy_cost')),
+            [(1, 4), (2, 5)],
+        )
+
+    def test_delete(self):
+        sync_bestiary_objs(
+            models.Level,
+            {(self.dungeon.pk, 2): {'energy_cost': 3}},
+            key_fields=('dungeon', 'floor'),
+            queryset=models.Level.objects.filter(dungeon=self.dungeon),
+            delete=True,
+        )
+        self.assertEqual(list(models.Level.objects.values_list('floor', flat=True)), [2])
+
+
+class SyncManyToMany(TestCase):
+    def setUp(self):
+        self.skills = [
+            models.Skill.objects.create(com2us_id=com2us_id, name=f'Skill {com2us_id}', max_level=1, slot=1)
+            for com2us_id in range(1, 4)
+        ]
+        self.monster = models.Monster.objects.create(com2us_id=1, name='Fairy', element=models.Monster.ELEMENT_WATER, base_stars=2, natural_stars=2)
+        self.monster.skills.set(self.skills[:2])
+
+    def test_add_and_remove(self):
+        sync_many_to_many(models.Monster.skills, {self.monster: self.skills[1:]})
+        self.assertEqual(list(self.monster.skills.order_by('com2us_id')), self.skills[1:])
+
+    def test_clear(self):
+        sync_many_to_many(models.Monster.skills, {self.monster: []})
+        self.assertFalse(self.monster.skills.exists())
+
+    def test_other_objects_untouched(self):
+        other = models.Monster.objects.create(com2us_id=2, name='Imp', element=models.Monster.ELEMENT_FIRE, base_stars=2, natural_stars=2)
+        other.skills.set(self.skills)
+        sync_many_to_many(models.Monster.skills, {self.monster: []})
+        self.assertEqual(other.skills.count(), 3)
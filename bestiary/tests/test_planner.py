@@ -0,0 +1,83 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from bestiary.models import (
+    AwakenCost, Fusion, GameItem, HomunculusSkill, HomunculusSkillCraftCost, Monster, MonsterCraftCost, Skill,
+)
+from bestiary.planner import material_requirements
+
+
+class MaterialRequirements(TestCase):
+    def create_monster(self, com2us_id, awakens_from=None, awaken_cost=0):
+        monster = Monster.objects.create(
+            com2us_id=com2us_id, name=f'Monster {com2us_id}', element=Monster.ELEMENT_FIRE, base_stars=3, natural_stars=3,
+            awakens_from=awakens_from, is_awakened=awakens_from is not None,
+        )
+        if awaken_cost:
+            AwakenCost.objects.create(monster=monster, item=self.essence, quantity=awaken_cost)
+        return monster
+
+    def setUp(self):
+        self.essence = GameItem.objects.create(com2us_id=11002, category=GameItem.CATEGORY_ESSENCE, name='Low Fire Essence')
+        self.mana = GameItem.objects.create(com2us_id=102, category=GameItem.CATEGORY_CURRENCY, name='Mana')
+
+        self.ingredient_1_base = self.create_monster(1, awaken_cost=10)
+        self.ingredient_1 = self.create_monster(11, self.ingredient_1_base)
+        self.ingredient_2_base = self.create_monster(2, awaken_cost=5)
+        self.ingredient_2 = self.create_monster(12, self.ingredient_2_base)
+
+        self.product_base = self.create_monster(3, awaken_cost=20)
+        self.product = self.create_monster(13, self.product_base)
+        self.fusion = Fusion.objects.create(product=self.product_base, cost=300000)
+        self.fusion.ingredients.set([self.ingredient_1, self.ingredient_2])
+
+        self.homunculus = self.create_monster(4)
+        MonsterCraftCost.objects.create(monster=self.homunculus, item=self.mana, quantity=1000)
+        self.homunculus_skill = HomunculusSkill.objects.create(skill=Skill.objects.create(name='Slash', description='', max_level=1))
+        HomunculusSkillCraftCost.objects.create(skill=self.homunculus_skill, item=self.essence, quantity=7)
+
+    def quantities(self, requirements):
+        return {item['name']: item['quantity'] for item in requirements['items']}
+
+    def test_fusion_tree(self):
+        with self.assertNumQueries(6):
+            requirements = material_requirements([self.product.pk])
+
+        self.assertEqual(self.quantities(requirements), {'Low Fire Essence': 35})
+        self.assertEqual(requirements['fusion_mana'], 300000)
+        self.assertEqual(requirements['fusions'], [{'fusion': self.fusion.pk, 'quantity': 1}])
+        self.assertEqual(requirements['summons'], [
+            {'monster': self.ingredient_1_base.pk, 'quantity': 1},
+            {'monster': self.ingredient_2_base.pk, 'quantity': 1},
+        ])
+
+    def test_owned_monsters(self):
+        requirements = material_requirements([self.product.pk], owned_monster_ids=[self.ingredient_1.pk])
+        self.assertEqual(self.quantities(requirements), {'Low Fire Essence': 25})
+        self.assertEqual(requirements['summons'], [{'monster': self.ingredient_2_base.pk, 'quantity': 1}])
+
+    def test_repeated_targets(self):
+        requirements = material_requirements([self.ingredient_1.pk, self.ingredient_1.pk])
+        self.assertEqual(self.quantities(requirements), {'Low Fire Essence': 20})
+        self.assertEqual(requirements['summons'], [{'monster': self.ingredient_1_base.pk, 'quantity': 2}])
+
+    def test_homunculus(self):
+        requirements = material_requirements([self.homunculus.pk], homunculus_skill_ids=[self.homunculus_skill.pk])
+        self.assertEqual(self.quantities(requirements), {'Low Fire Essence': 7, 'Mana': 1000})
+        self.assertEqual(requirements['summons'], [])
+
+    def test_unknown_monster(self):
+        with self.assertRaises(ValueError):
+            material_requirements([self.product.pk, 999999])
+
+    def test_api(self):
+        client = APIClient()
+        url = '/api/v2/material-planner/'
+
+        response = client.get(url, {'monsters': f'{self.product.pk},{self.homunculus.pk}', 'owned': self.ingredient_2.pk}, secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['fusion_mana'], 300000)
+
+        self.assertEqual(client.get(url, secure=True).status_code, 400)
+        self.assertEqual(client.get(url, {'monsters': 'abc'}, secure=True).status_code, 400)
+        self.assertEqual(client.get(url, {'monsters': '999999'}, secure=True).status_code, 400)
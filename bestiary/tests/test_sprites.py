@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from bestiary import sprites
+
+SPRITE_MAP = {
+    'atlases': {
+        'monsters-fire': {'file': 'monsters-fire.webp', 'cols': 3, 'rows': 2, 'cell_size': 50},
+    },
+    'sprites': {
+        'monsters/unit_icon_0001_0_0.png': {'atlas': 'monsters-fire', 'col': 2, 'row': 1},
+    },
+}
+
+
+@mock.patch.object(sprites, 'sprite_map', lambda: SPRITE_MAP)
+class Sprites(SimpleTestCase):
+    def test_get_sprite(self):
+        sprite = sprites.get_sprite('monsters', 'unit_icon_0001_0_0.png')
+        self.assertEqual(sprite['url'], '/static/herders/images/sprites/monsters-fire.webp')
+        self.assertEqual((sprite['x'], sprite['y'], sprite['width'], sprite['height']), (100, 50, 50, 50))
+        self.assertEqual(sprite['background_position'], '100.0% 100.0%')
+        self.assertEqual(sprite['background_size'], '300% 200%')
+
+    def test_not_in_atlas(self):
+        self.assertIsNone(sprites.get_sprite('monsters', 'unit_icon_0002_0_0.png'))
+
+    def test_image_tag_sprite(self):
+        html = sprites.image_tag('monsters', 'unit_icon_0001_0_0.png', 'monster-thumb', 'Ifrit')
+        self.assertInHTML(
+            '<span class="sprite monster-thumb" role="img" aria-label="Ifrit" style="display: inline-block; '
+            'background: url(/static/herders/images/sprites/monsters-fire.webp) 100.0% 100.0% / 300% 200% no-repeat;"></span>',
+            html,
+        )
+
+    def test_image_tag_fallback(self):
+        html = sprites.image_tag('monsters', 'unit_icon_0002_0_0.png', size=42)
+        self.assertInHTML(
+            '<img src="/static/herders/images/monsters/unit_icon_0002_0_0.png" class="" alt="" height="42" width="42" loading="lazy" />',
+            html,
+        )
+
+
+class SpriteMap(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, sprites.SPRITE_DIRECTORY, sprites.SPRITE_MAP)
+
+        # Resetting STATIC_ROOT also resets staticfiles_storage
+        static_root = override_settings(STATIC_ROOT=tmp.name)
+        static_root.enable()
+        self.addCleanup(static_root.disable)
+
+        patcher = mock.patch.object(sprites, '_sprite_map', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _write(self, sprite_map):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump(sprite_map, f)
+
+    def test_not_built(self):
+        self.assertEqual(sprites.sprite_map(), {'atlases': {}, 'sprites': {}})
+
+    def test_loaded_once(self):
+        self._write(SPRITE_MAP)
+        self.assertEqual(sprites.sprite_map(), SPRITE_MAP)
+
+        with mock.patch.object(sprites.staticfiles_storage, 'open') as storage_open:
+            self.assertIs(sprites.sprite_map(), sprites.sprite_map())
+        storage_open.assert_not_called()
+
+    def test_cleared(self):
+        self.assertEqual(sprites.sprite_map()['sprites'], {})
+
+        self._write(SPRITE_MAP)
+        sprites.clear_sprite_map()
+        self.assertEqual(sprites.sprite_map(), SPRITE_MAP)
@@ -0,0 +1,115 @@
+import json
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from bestiary import stat_curves
+from bestiary.models import Monster, MonsterStatTable
+from bestiary.parse.monsters import monster_stat_tables
+
+
+class StatCurves(SimpleTestCase):
+    def test_matches_actual_stat(self):
+        stats = np.arange(1, 2001)
+        curves = stat_curves.stat_curves(stats)
+
+        for grade in range(1, 7):
+            for level in range(1, stat_curves.max_level(grade) + 1):
+                expected = [stat_curves.actual_stat(stat, grade, level) for stat in stats.tolist()]
+                self.assertEqual(curves[:, grade - 1, level - 1].tolist(), expected, f'{grade}* level {level}')
+
+    def test_known_values(self):
+        curves = stat_curves.stat_curves(755)
+        self.assertEqual(curves[0, 0], 755)
+        self.assertEqual(curves[5, 39], 8289)
+        self.assertEqual(curves[2, 20], 3101)
+
+    def test_above_max_level(self):
+        self.assertFalse(stat_curves.stat_curves(755)[0, 15:].any())
+
+    def test_missing_stats(self):
+        self.assertFalse(stat_curves.stat_curves([0, None]).any())
+
+    def test_halfway_values_use_math_module(self):
+        # Simulate NumPy landing on the wrong side of .5 for every value
+        with mock.patch.object(stat_curves.np, 'floor', side_effect=lambda values: values - 0.5):
+            curves = stat_curves.stat_curves([755])
+        self.assertEqual(curves[0, 2, 20], stat_curves.actual_stat(755, 3, 21))
+
+
+class MonsterStatCurves(SimpleTestCase):
+    def setUp(self):
+        self.monster = Monster(raw_hp=723, raw_attack=1134, raw_defense=None, base_stars=3)
+
+    def test_actual_stats(self):
+        self.assertEqual(self.monster.actual_hp(3, 25), stat_curves.actual_stat(723, 3, 25) * 15)
+        self.assertEqual(self.monster.actual_attack(6, 17), stat_curves.actual_stat(1134, 6, 17))
+        self.assertIsNone(self.monster.actual_defense(6, 40))
+
+    def test_outside_bestiary_levels(self):
+        self.assertEqual(self.monster.actual_attack(6, 45), stat_curves.actual_stat(1134, 6, 45))
+
+    def test_cache_follows_raw_stats(self):
+        self.monster.actual_attack(6, 40)
+        self.monster.raw_attack = 500
+        self.assertEqual(self.monster.actual_attack(6, 40), stat_curves.actual_stat(500, 6, 40))
+
+    def test_many_monsters(self):
+        other = Monster(raw_hp=100, raw_attack=200, raw_defense=300)
+        curves = stat_curves.monster_stat_curves([self.monster, other])
+
+        self.assertEqual(curves.shape, (2, 3, 6, 40))
+        self.assertEqual(curves[1, stat_curves.HP, 5, 39], stat_curves.actual_stat(100, 6, 40) * 15)
+        self.assertEqual(curves[1, stat_curves.DEF, 0, 0], 300)
+        self.assertTrue(np.shares_memory(other.stat_curves(), curves[1]))
+
+
+class StoredStatTables(TestCase):
+    def setUp(self):
+        self.monster = Monster.objects.create(
+            com2us_id=1, name='Fairy', element=Monster.ELEMENT_WATER, base_stars=2, natural_stars=2,
+            raw_hp=723, raw_attack=1134, raw_defense=500,
+        )
+
+    def test_created_and_updated(self):
+        monster_stat_tables()
+        stat_table = MonsterStatTable.objects.get(monster=self.monster)
+        self.assertEqual(stat_table.chart, json.dumps(stat_curves.stat_chart(self.monster)))
+
+        self.monster.raw_hp = 800
+        self.monster.save()
+        monster_stat_tables()
+        stat_table.refresh_from_db()
+        self.assertEqual(json.loads(stat_table.curves)[stat_curves.HP][5][39], stat_curves.actual_stat(800, 6, 40) * 15)
+
+    def test_unchanged_not_recalculated(self):
+        monster_stat_tables()
+        with mock.patch.object(stat_curves, 'stat_chart') as stat_chart:
+            monster_stat_tables()
+        stat_chart.assert_not_called()
+
+    def test_recalculated_when_calculations_change(self):
+        monster_stat_tables()
+        with mock.patch.object(stat_curves, 'CURVE_VERSION', stat_curves.CURVE_VERSION + 1):
+            self.assertEqual(monster_stat_tables(), [self.monster])
+            self.assertEqual(monster_stat_tables(), [])
+
+    def test_stored_values_used(self):
+        monster_stat_tables()
+        MonsterStatTable.objects.update(curves=json.dumps(np.ones((3, 6, 40), dtype=int).tolist()), chart='{}')
+        monster = Monster.objects.select_related('stat_table').get(pk=self.monster.pk)
+
+        with mock.patch.object(stat_curves, 'monster_stat_curves') as monster_stat_curves:
+            self.assertEqual(monster.actual_attack(6, 40), 1)
+            self.assertEqual(monster.stat_chart_json(), '{}')
+        monster_stat_curves.assert_not_called()
+
+    def test_outdated_table_ignored(self):
+        monster_stat_tables()
+        MonsterStatTable.objects.update(chart='{}')
+        monster = Monster.objects.select_related('stat_table').get(pk=self.monster.pk)
+        monster.raw_attack = 1000
+
+        self.assertEqual(monster.actual_attack(6, 40), stat_curves.actual_stat(1000, 6, 40))
+        self.assertNotEqual(monster.stat_chart_json(), '{}')
@@ -0,0 +1,91 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from bestiary.models import AwakenCost, Fusion, GameItem, LeaderSkill, Monster, Skill, SkillEffect, SkillEffectDetail, Source
+
+
+class BestiaryDetail(TestCase):
+    MAX_QUERIES = 11
+
+    def setUp(self):
+        self.source = Source.objects.create(name='Unknown Scroll')
+        self.effect = SkillEffect.objects.create(name='Stun', description='Cannot take turns')
+        self.leader_skill = LeaderSkill.objects.create(attribute=LeaderSkill.ATTRIBUTE_HP, amount=15)
+
+    def create_family(self, family_id, forms):
+        # Chain of awakened forms, each with skills, effects, a source and a leader skill
+        chain = []
+        for form in range(forms):
+            monster = Monster.objects.create(
+                com2us_id=family_id * 100 + form, family_id=family_id, name=f'Monster {family_id}', element=Monster.ELEMENT_WATER,
+                base_stars=2 + form, natural_stars=2, is_awakened=form > 0, awakens_from=chain[-1] if chain else None,
+                leader_skill=self.leader_skill, raw_hp=500, raw_attack=500, raw_defense=500,
+            )
+            if chain:
+                chain[-1].awakens_to = monster
+                chain[-1].save()
+            chain.append(monster)
+
+            other_skill = Skill.objects.create(name='Other', description='Other', max_level=1)
+            for slot in range(1, 4):
+                skill = Skill.objects.create(
+                    name=f'Skill {slot}', description='Attack', slot=slot, max_level=5,
+                    other_skill=other_skill if slot == 3 else None,
+                )
+                SkillEffectDetail.objects.create(skill=skill, effect=self.effect)
+                SkillEffectDetail.objects.create(skill=skill, effect=self.effect)
+                monster.skills.add(skill)
+            SkillEffectDetail.objects.create(skill=other_skill, effect=self.effect)
+            monster.source.add(self.source)
+
+        fusion = Fusion.objects.create(product=chain[0], cost=1000)
+        fusion.ingredients.add(chain[-1])
+
+        # Saving each form updated the slugs of the forms awakened from it
+        for monster in chain:
+            monster.refresh_from_db()
+        return chain
+
+    def get_queries(self, monster):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('bestiary:detail', kwargs={'monster_slug': monster.bestiary_slug}), secure=True)
+
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_chain(self):
+        chain = self.create_family(101, 2)
+        response = self.client.get(reverse('bestiary:detail', kwargs={'monster_slug': chain[1].bestiary_slug}), secure=True)
+        self.assertEqual(response.context['monsters'], chain)
+        self.assertEqual(response.context['family'], [chain[1]])
+
+    def test_query_count_independent_of_family_size(self):
+        small = self.get_queries(self.create_family(101, 1)[0])
+        large = self.get_queries(self.create_family(102, 3)[0])
+
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, self.MAX_QUERIES)
+
+
+class ApiMonster(TestCase):
+    def setUp(self):
+        # Monsters with the same com2us id are all returned with full details
+        for element, awaken_costs in [(Monster.ELEMENT_WATER, [(11001, 10), (12001, 5)]), (Monster.ELEMENT_FIRE, [(11006, 3)])]:
+            monster = Monster.objects.create(
+                com2us_id=10111, family_id=101, name='Fairy', element=element, base_stars=2, natural_stars=2,
+            )
+            for com2us_id, quantity in awaken_costs:
+                item = GameItem.objects.create(com2us_id=com2us_id, category=GameItem.CATEGORY_ESSENCE, name=f'Essence {com2us_id}')
+                AwakenCost.objects.create(monster=monster, item=item, quantity=quantity)
+
+    def test_list_awakening_materials(self):
+        # Count, monsters and the awakening costs of all monsters, then skills, homunculus skills and sources per monster
+        with self.assertNumQueries(9):
+            response = self.client.get('/api/bestiary', {'com2us_id': 10111}, secure=True)
+
+        self.assertEqual(response.status_code, 200)
+        fire, water = response.data
+        self.assertEqual((water['awaken_mats_water_low'], water['awaken_mats_water_mid'], water['awaken_mats_magic_low']), (10, 5, 0))
+        self.assertEqual((fire['awaken_mats_water_low'], fire['awaken_mats_magic_low']), (0, 3))
@@ -1,11 +1,12 @@
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.db.models import Prefetch, prefetch_related_objects
 from django.http import Http404
 from django.shortcuts import render
 from django.urls import reverse
 
 from .filters import MonsterFilter
 from .forms import FilterMonsterForm
-from .models import Monster
+from .models import AwakenCost, Fusion, Monster, Skill
 
 
 def bestiary(request):
@@ -38,7 +39,10 @@ def _bestiary_inventory(request):
     if name_search:
         post_data.update({'name': name_search})
 
-    monster_queryset = Monster.objects.filter(obtainable=True).select_related('awakens_from', 'awakens_to', 'leader_skill').prefetch_related('skills')
+    monster_queryset = Monster.objects.filter(obtainable=True).select_related('awakens_from', 'awakens_to', 'leader_skill').prefetch_related(
+        'skills',
+        Prefetch('awakencost_set', queryset=AwakenCost.objects.select_related('item')),
+    )
     form = FilterMonsterForm(post_data or None)
 
     # Get queryset sort options
@@ -102,17 +106,26 @@ def bestiary_detail(request, monster_slug):
     if monster is None:
         raise Http404()
 
-    mon = monster.base_monster
-    monsters = []
-
-    while mon is not None:
-        monsters.append(mon)
-        mon = mon.awakens_to
+    monsters, family = Monster.detail_page_monsters(monster)
+
+    # Everything the detail templates show for each monster, loaded once for the whole chain.
+    # Stat tables and charts are calculated when game data is parsed.
+    prefetch_related_objects(
+        monsters,
+        'stat_table',
+        'source',
+        Prefetch('awakencost_set', queryset=AwakenCost.objects.select_related('item')),
+        Prefetch('skills', queryset=Skill.objects.select_related('other_skill')),
+        'skills__effect',
+        'skills__other_skill__effect',
+        Prefetch('fusion_ingredient_for', queryset=Fusion.objects.select_related('product')),
+        'fusion__ingredients',
+    )
 
     context = {
         'view': 'bestiary',
         'active_slug': monster_slug,
-        'family': monster.monster_family(),
+        'family': family,
         'monsters': monsters,
     }
 
@@ -1,5 +1,7 @@
 from django import template
 
+from bestiary import sprites
+
 register = template.Library()
 
 
@@ -67,3 +69,9 @@ def timedelta(delta):
         return f'{minutes:02d}:{seconds:2.3f}'
     else:
         return ''
+
+
+# Image from herders/images/<directory>, drawn from its sprite atlas when there is one
+@register.simple_tag
+def sprite(directory, filename, css_class='', alt=''):
+    return sprites.image_tag(directory, filename, css_class, alt)